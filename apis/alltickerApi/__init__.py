@@ -0,0 +1 @@
+from .fetcher import AlltickSource, normalize_klines, KLINE_TYPES
\ No newline at end of file
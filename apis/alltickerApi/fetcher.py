@@ -1,11 +1,246 @@
-import requests
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Optional
 
-url = "https://quote.alltick.io/quote-stock-b-api/kline"
-params = {
-    "token": "cd3ec6e46be2d11831ae3b10264c419c-c-app",
-    "query": '{"trace": "python_http_test1", "data": {"code": "EURUSD", "kline_type": 1, "query_kline_num": 10}}'
+import aiohttp
+import pandas as pd
+
+from apis.circuitBreaker import get_breaker
+
+logger = logging.getLogger("oracle.link")
+
+BASE_URL: str = "https://quote.alltick.io"
+FOREX_ENDPOINT: str = "/quote-b-api/batch-kline"  # Forex, metals, crypto, commodities
+STOCK_ENDPOINT: str = "/quote-stock-b-api/batch-kline"  # US, HK and A-share stocks
+STOCK_MARKETS: tuple[str, ...] = ('.US', '.HK', '.SH', '.SZ')
+
+# Alltick `kline_type` of every bot interval
+KLINE_TYPES: dict[str, int] = {
+    '1m': 1, '5m': 2, '15m': 3, '30m': 4, '1h': 5, '2h': 6, '4h': 7, '1d': 8, '1w': 9, '1M': 10,
+}
+CANDLE_LENGTHS: dict[str, pd.DateOffset | pd.Timedelta] = {
+    '1m': pd.Timedelta(minutes=1), '5m': pd.Timedelta(minutes=5), '15m': pd.Timedelta(minutes=15),
+    '30m': pd.Timedelta(minutes=30), '1h': pd.Timedelta(hours=1), '2h': pd.Timedelta(hours=2),
+    '4h': pd.Timedelta(hours=4), '1d': pd.Timedelta(days=1), '1w': pd.Timedelta(weeks=1),
+    '1M': pd.DateOffset(months=1),
 }
+MAX_KLINES: int = 500  # Candles per code and request
+
+
+def normalize_klines(kline_data: list[dict], interval: str) -> pd.DataFrame:
+    """
+    Converts Alltick kline rows to the frame shape of the Binance fetcher.
+
+    Parameters:
+    - kline_data (list[dict]): Rows with 'timestamp' (seconds) and the '*_price' and 'volume' fields as strings.
+    - interval (str): Bot interval of the rows, e.g. '1h'.
+
+    Returns:
+    - pd.DataFrame: Open, High, Low, Close, Volume and Close Time, with 'Open Time' (naive UTC) as the index.
+    """
+    df = pd.DataFrame(kline_data, columns=['timestamp', 'open_price', 'high_price', 'low_price',
+                                           'close_price', 'volume'])
+    df.columns = ['Open Time', 'Open', 'High', 'Low', 'Close', 'Volume']
+    df['Open Time'] = pd.to_datetime(df['Open Time'].astype('int64'), unit='s')
+    df.set_index('Open Time', inplace=True)
+    df.sort_index(inplace=True)
+    df = df[~df.index.duplicated(keep='last')]
+
+    float_cols = ['Open', 'High', 'Low', 'Close', 'Volume']
+    df[float_cols] = df[float_cols].astype(float)
+    df['Close Time'] = df.index + CANDLE_LENGTHS[interval] - pd.Timedelta(milliseconds=1)
+    return df
+
+
+def _endpoint(code: str) -> str:
+    return STOCK_ENDPOINT if code.upper().endswith(STOCK_MARKETS) else FOREX_ENDPOINT
+
+
+class AlltickSource:
+    """
+    Forex, metal and stock klines from the Alltick quote API.
+
+    Requests that arrive within `batch_window` seconds of each other, e.g. the fetches of all
+    watched codes at a candle boundary, are sent as one batch-kline request of up to `max_batch`
+    codes. Requests are spaced by `min_request_interval` to stay inside the plan's quota and
+    share one keep-alive session.
+    """
+
+    def __init__(self, token: str, base_url: str = BASE_URL, max_batch: int = 10, batch_window: float = 0.05,
+                 min_request_interval: float = 1.0, timeout: float = 10):
+        """
+        Parameters:
+        - token (str): Alltick API token.
+        - base_url (str): Quote API base url.
+        - max_batch (int): Codes per batch request.
+        - batch_window (float): Seconds to wait for further requests before sending a batch.
+        - min_request_interval (float): Minimum seconds between two requests.
+        - timeout (float): Seconds until a request is given up.
+        """
+        if not token:
+            raise ValueError("An Alltick token is required")
+
+        self.token = token
+        self.base_url = base_url.rstrip('/')
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self.min_request_interval = min_request_interval
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.breaker = get_breaker('Alltick', failure_threshold=5, recovery_timeout=60)
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        # Waiting requests by endpoint, then (code, kline_type), each with its (limit, future) callers
+        self._pending: dict[str, dict[tuple[str, int], list[tuple[int, asyncio.Future]]]] = {}
+        self._flush_tasks: dict[str, asyncio.Task] = {}
+        self._request_lock = asyncio.Lock()
+        self._last_request: float = 0
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=self.timeout)
+        return self._session
+
+    async def fetch_klines(self, symbol: str, interval: str, limit: int) -> pd.DataFrame:
+        """
+        Fetches the last `limit` klines (including the open one) of an Alltick code.
+
+        Parameters:
+        - symbol (str): Alltick code (e.g., 'EURUSD', 'XAUUSD', 'AAPL.US', '700.HK').
+        - interval (str): Kline interval, one of `KLINE_TYPES`.
+        - limit (int): Number of data points to retrieve (max 500).
+
+        Returns:
+        - pd.DataFrame: DataFrame containing kline data, shaped like the Binance fetcher's.
+
+        Raises:
+        - ValueError: Alltick doesn't offer `interval` or `symbol`.
+        - CircuitOpenError: Alltick failed repeatedly and isn't called until it recovers.
+        """
+        kline_type = KLINE_TYPES.get(interval)
+        if kline_type is None:
+            raise ValueError(f"Alltick doesn't support the {interval} interval. "
+                             f"Valid options: {', '.join(KLINE_TYPES)}")
+        if limit > MAX_KLINES:
+            logger.debug(f"Alltick serves at most {MAX_KLINES} candles, requested {limit} for {symbol}")
+            limit = MAX_KLINES
+
+        code = symbol.upper()
+        endpoint = _endpoint(code)
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(endpoint, {}).setdefault((code, kline_type), []).append((limit, future))
+        if endpoint not in self._flush_tasks:
+            self._flush_tasks[endpoint] = asyncio.create_task(self._flush(endpoint))
+
+        kline_data: list[dict] = await future
+        return normalize_klines(kline_data, interval).iloc[-limit:]
+
+    async def _flush(self, endpoint: str):
+        await asyncio.sleep(self.batch_window)
+        # Requests arriving from now on start the next batch
+        pending = self._pending.pop(endpoint, {})
+        del self._flush_tasks[endpoint]
+
+        try:
+            await self._send_batches(endpoint, pending)
+        finally:  # Cancelled, e.g. while `close` shuts the session, don't leave the callers waiting
+            for callers in pending.values():
+                for _, future in callers:
+                    if not future.done():
+                        future.set_exception(ConnectionError("Alltick source was closed"))
+
+    async def _send_batches(self, endpoint: str, pending: dict[tuple[str, int], list[tuple[int, asyncio.Future]]]):
+        keys = list(pending)
+        for start in range(0, len(keys), self.max_batch):
+            batch = {key: pending[key] for key in keys[start:start + self.max_batch]}
+            try:
+                results = await self._request(endpoint, {key: max(limit for limit, _ in callers)
+                                                         for key, callers in batch.items()})
+            except Exception as e:
+                for callers in batch.values():
+                    for _, future in callers:
+                        if not future.done():
+                            future.set_exception(e)
+                continue
+
+            for (code, kline_type), callers in batch.items():
+                rows = results.get((code, kline_type))
+                for _, future in callers:
+                    if future.done():
+                        continue
+                    if rows is None:
+                        future.set_exception(ValueError(f"{code} isn't available on Alltick"))
+                    else:
+                        future.set_result(rows)
+
+    async def _request(self, endpoint: str, limits: dict[tuple[str, int], int]) -> dict[tuple[str, int], list[dict]]:
+        """Send one batch-kline request, return the kline rows by (code, kline_type)."""
+        query = {
+            'trace': uuid.uuid4().hex,
+            'data': {'data_list': [
+                {'code': code, 'kline_type': kline_type, 'kline_timestamp_end': 0,
+                 'query_kline_num': limit, 'adjust_type': 0}
+                for (code, kline_type), limit in limits.items()
+            ]},
+        }
+
+        async with self._request_lock:
+            wait = self._last_request + self.min_request_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            self.breaker.before_call()
+            logger.debug(f"Fetching {len(limits)} Alltick kline series from {endpoint}")
+            try:
+                async with self._get_session().post(f"{self.base_url}{endpoint}", params={'token': self.token},
+                                                    data=json.dumps(query)) as response:
+                    response.raise_for_status()
+                    body = await response.json(content_type=None)
+            except aiohttp.ClientResponseError as e:
+                if e.status >= 500:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()  # Alltick answered, the request itself is wrong
+                raise
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                self.breaker.record_failure()
+                raise
+            finally:
+                self._last_request = time.monotonic()
+
+        self.breaker.record_success()  # Alltick answered, errors below are about the request
+        if body.get('ret') != 200:
+            raise Exception(f"Alltick error {body.get('ret')}: {body.get('msg')}")
+
+        return {(item['code'].upper(), int(item['kline_type'])): item.get('kline_data') or []
+                for item in (body.get('data') or {}).get('kline_list', [])}
+
+    async def close(self):
+        for callers in (callers for pending in self._pending.values() for callers in pending.values()):
+            for _, future in callers:
+                if not future.done():
+                    future.set_exception(ConnectionError("Alltick source was closed"))
+        self._pending.clear()
+        for task in self._flush_tasks.values():
+            task.cancel()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+if __name__ == '__main__':
+    import os
+
+    async def main():
+        source = AlltickSource(os.environ['ALLTICK_TOKEN'])
+        try:
+            eurusd, gold = await asyncio.gather(source.fetch_klines('EURUSD', '1m', 10),
+                                                source.fetch_klines('XAUUSD', '1h', 10))
+            print(eurusd.tail())
+            print(gold.tail())
+        finally:
+            await source.close()
 
-response = requests.get(url, params=params)
-data = response.json()
-print(data)
+    asyncio.run(main())
@@ -1 +1,2 @@
-from .fetcher import fetch_klines
\ No newline at end of file
+from .fetcher import fetch_klines, fetch_prices, fetch_usdt_symbols, fetch_server_time
+from .exchangeClock import ExchangeClock
\ No newline at end of file
@@ -0,0 +1,65 @@
+import logging
+import time
+from typing import Callable, Optional
+
+from utils import set_clock_offset, get_clock_offset
+
+logger = logging.getLogger("oracle.link")
+
+
+class ExchangeClock:
+    """
+    Keeps `utils.utc_timestamp` in sync with the exchange clock.
+
+    Each sync takes a few server time samples and uses the one with the shortest round trip,
+    assuming the server read its clock halfway through the request. Candle boundaries and
+    closed-candle checks then follow the exchange instead of the local clock.
+    """
+
+    def __init__(self, fetch_server_time: Callable[[], float], samples: int = 3, max_round_trip: float = 2.0):
+        """
+        :param fetch_server_time: Returns the exchange time as UNIX timestamp in seconds.
+        :param samples: Requests per sync, the fastest one is used.
+        :param max_round_trip: Samples slower than this (seconds) are too imprecise and ignored.
+        """
+        self.fetch_server_time = fetch_server_time
+        self.samples = samples
+        self.max_round_trip = max_round_trip
+        self.round_trip: Optional[float] = None
+
+    def measure(self) -> Optional[tuple[float, float]]:
+        """:return: (offset, round trip) of the best sample, None if every sample failed or was too slow."""
+        best: Optional[tuple[float, float]] = None
+        for _ in range(self.samples):
+            sent = time.time()
+            try:
+                server_time = self.fetch_server_time()
+            except Exception as e:
+                logger.debug(f"Server time sample failed: {e}")
+                continue
+            received = time.time()
+
+            round_trip = received - sent
+            if round_trip > self.max_round_trip:
+                continue
+            offset = server_time - (sent + received) / 2
+            if best is None or round_trip < best[1]:
+                best = (offset, round_trip)
+        return best
+
+    def sync(self) -> Optional[float]:
+        """
+        Measure the offset and apply it with `utils.set_clock_offset`.
+
+        :return: The applied offset in seconds, None if it couldn't be measured (the old offset is kept).
+        """
+        measurement = self.measure()
+        if measurement is None:
+            logger.warning(f"Exchange clock sync failed, keeping offset {get_clock_offset():+.3f}s")
+            return None
+
+        offset, self.round_trip = measurement
+        if abs(offset - get_clock_offset()) > 0.5:
+            logger.info(f"Exchange clock offset changed to {offset:+.3f}s (round trip {self.round_trip * 1000:.0f}ms)")
+        set_clock_offset(offset)
+        return offset
@@ -3,9 +3,14 @@ import pandas as pd
 from binance.client import Client
 from binance.exceptions import BinanceAPIException, BinanceRequestException
 
-client = Client()
+from apis.circuitBreaker import CircuitBreaker, CircuitOpenError, get_breaker
 
-def fetch_klines(symbol: str, interval: str, limit: int, max_retries: int = 5, base_delay: float = 1.0) -> pd.DataFrame:
+client = Client(ping=False)  # No request at import time
+# Opens after 5 consecutive failed requests, then every caller fails fast until a probe succeeds
+breaker = get_breaker('Binance', failure_threshold=5, recovery_timeout=30)
+
+def fetch_klines(symbol: str, interval: str, limit: int, max_retries: int = 5, base_delay: float = 1.0,
+                 circuit_breaker: CircuitBreaker | None = None) -> pd.DataFrame:
     """
     Fetches historical kline (candlestick) data from Binance with retry logic.
 
@@ -15,33 +20,42 @@ def fetch_klines(symbol: str, interval: str, limit: int, max_retries: int = 5, b
     - limit (int): Number of data points to retrieve (max 1000).
     - max_retries (int): Maximum number of retries on API failure.
     - base_delay (float): Initial delay between retries (doubles each time).
+    - circuit_breaker (CircuitBreaker | None): Breaker counting the failures, the shared Binance breaker if None.
 
     Returns:
     - pd.DataFrame: DataFrame containing kline data.
+
+    Raises:
+    - CircuitOpenError: Binance failed repeatedly and isn't called until it recovers.
     """
+    circuit_breaker = circuit_breaker or breaker
     error: Exception | None = None
     for attempt in range(max_retries):
+        circuit_breaker.before_call()
         try:
             klines = client.get_klines(symbol=symbol, interval=interval, limit=limit)
+            circuit_breaker.record_success()
             break  # Success
         except BinanceAPIException as e:
             if e.code == 0 and "503 ERROR" in str(e):
                 error = e
-                wait = base_delay * (2 ** attempt)
-                print(f"[Retry {attempt+1}] Binance CloudFront 503 error. Waiting {wait:.2f}s...")
-                time.sleep(wait)
+                message = "Binance CloudFront 503 error."
             else:
+                circuit_breaker.record_success()  # Binance answered, the request itself is wrong
                 raise  # Unhandled error, re-raise
         except BinanceRequestException as e:
             error = e
-            wait = base_delay * (2 ** attempt)
-            print(f"[Retry {attempt+1}] Network error: {e}. Waiting {wait:.2f}s...")
-            time.sleep(wait)
+            message = f"Network error: {e}."
         except Exception as e:
             error = e
-            wait = base_delay * (2 ** attempt)
-            print(f"[Retry {attempt+1}] Unexpected error: {e}. Waiting {wait:.2f}s...")
-            time.sleep(wait)
+            message = f"Unexpected error: {e}."
+
+        circuit_breaker.record_failure()
+        if circuit_breaker.is_open:
+            raise CircuitOpenError(circuit_breaker.name, circuit_breaker.retry_in) from error
+        wait = base_delay * (2 ** attempt)
+        print(f"[Retry {attempt+1}] {message} Waiting {wait:.2f}s...")
+        time.sleep(wait)
 
     else:
         raise error
@@ -67,3 +81,33 @@ def fetch_klines(symbol: str, interval: str, limit: int, max_retries: int = 5, b
     df[float_cols] = df[float_cols].astype(float)
 
     return df
+
+def fetch_prices() -> dict[str, float]:
+    """
+    Fetches the last price of every symbol with a single request.
+
+    Returns:
+    - dict[str, float]: Last price by symbol.
+    """
+    return {ticker['symbol']: float(ticker['price']) for ticker in breaker.call(client.get_symbol_ticker)}
+
+def fetch_server_time() -> float:
+    """
+    Fetches the Binance server time.
+
+    Returns:
+    - float: UNIX timestamp in seconds.
+    """
+    return breaker.call(client.get_server_time)['serverTime'] / 1000
+
+def fetch_usdt_symbols() -> list[str]:
+    """
+    Fetches every spot pair quoted in USDT that is currently trading.
+
+    Returns:
+    - list[str]: Symbols (e.g. 'BTCUSDT').
+    """
+    return [
+        symbol['symbol'] for symbol in client.get_exchange_info()['symbols']
+        if symbol['quoteAsset'] == 'USDT' and symbol['status'] == 'TRADING'
+    ]
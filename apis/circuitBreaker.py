@@ -0,0 +1,130 @@
+import logging
+import threading
+import time
+from enum import Enum
+from typing import Callable, Optional, TypeVar
+
+logger = logging.getLogger("oracle.link")
+
+T = TypeVar('T')
+
+
+class CircuitState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a data source whose circuit is open."""
+
+    def __init__(self, source: str, retry_in: float):
+        super().__init__(f"{source} is unavailable, retrying in {retry_in:.0f}s")
+        self.source = source
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Stops calling a data source after `failure_threshold` consecutive failures.
+
+    While open every call fails fast with `CircuitOpenError`. After `recovery_timeout` seconds a
+    single probe is let through (half-open): success closes the circuit, failure opens it again with
+    a doubled timeout (up to `max_recovery_timeout`). Thread safe, the fetchers run in worker threads.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30,
+                 max_recovery_timeout: float = 600):
+        """
+        :param name: Data source name used in errors and logs.
+        :param failure_threshold: Consecutive failures that open the circuit.
+        :param recovery_timeout: Seconds until the first probe.
+        :param max_recovery_timeout: Upper bound of the timeout, which doubles with each failed probe.
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.max_recovery_timeout = max_recovery_timeout
+
+        self._lock = threading.Lock()
+        self._state: CircuitState = CircuitState.CLOSED
+        self._failures: int = 0
+        self._timeout: float = recovery_timeout
+        self._opened_at: float = 0
+        self._probing: bool = False
+
+    @property
+    def state(self) -> CircuitState:
+        with self._lock:
+            if self._state is CircuitState.OPEN and self._retry_in() <= 0:
+                return CircuitState.HALF_OPEN
+            return self._state
+
+    def _retry_in(self) -> float:
+        return self._opened_at + self._timeout - time.monotonic()
+
+    @property
+    def retry_in(self) -> float:
+        """Seconds until the next probe is let through, 0 if calls go through now."""
+        with self._lock:
+            return 0 if self._state is CircuitState.CLOSED else max(self._retry_in(), 0)
+
+    def before_call(self):
+        """Raise `CircuitOpenError` unless a call may go through now."""
+        with self._lock:
+            if self._state is CircuitState.CLOSED:
+                return
+            if self._probing or self._retry_in() > 0:
+                raise CircuitOpenError(self.name, max(self._retry_in(), 0))
+            # Half-open: this call is the probe, everyone else keeps failing fast
+            self._state = CircuitState.HALF_OPEN
+            self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            if self._state is not CircuitState.CLOSED:
+                logger.info(f"{self.name} recovered, closing circuit")
+            self._state = CircuitState.CLOSED
+            self._failures = 0
+            self._timeout = self.recovery_timeout
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state is CircuitState.HALF_OPEN:
+                self._timeout = min(self._timeout * 2, self.max_recovery_timeout)
+            elif self._state is CircuitState.OPEN or self._failures < self.failure_threshold:
+                return
+
+            logger.warning(f"{self.name} failed {self._failures} times in a row, "
+                           f"opening circuit for {self._timeout:.0f}s")
+            self._state = CircuitState.OPEN
+            self._opened_at = time.monotonic()
+            self._probing = False
+
+    @property
+    def is_open(self) -> bool:
+        return self.state is not CircuitState.CLOSED
+
+    def call(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """Call `func` through the breaker, every exception counts as a failure."""
+        self.before_call()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(name: str, **kwargs) -> CircuitBreaker:
+    """Shared breaker of a data source, created with `kwargs` on first use."""
+    breaker: Optional[CircuitBreaker] = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(name, **kwargs)
+    return breaker
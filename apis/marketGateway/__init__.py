@@ -0,0 +1,2 @@
+from .gateway import MarketDataGateway, KlineSource, parse_symbol
+from .ccxtSource import CcxtSource, normalize_ohlcv
\ No newline at end of file
@@ -0,0 +1,86 @@
+import asyncio
+import logging
+from typing import Any, Optional
+
+import ccxt
+import ccxt.async_support as ccxt_async
+import pandas as pd
+
+from apis.circuitBreaker import get_breaker
+
+logger = logging.getLogger("oracle.link")
+
+OHLCV_COLUMNS: list[str] = ['Open Time', 'Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def normalize_ohlcv(ohlcv: list[list], interval_ms: int) -> pd.DataFrame:
+    """ccxt OHLCV rows to the frame shape of the Binance fetcher ('Open Time' index, 'Close Time' column)."""
+    df = pd.DataFrame(ohlcv, columns=OHLCV_COLUMNS)
+    df['Open Time'] = pd.to_datetime(df['Open Time'], unit='ms')
+    df.set_index('Open Time', inplace=True)
+    df[OHLCV_COLUMNS[1:]] = df[OHLCV_COLUMNS[1:]].astype(float)
+    df['Close Time'] = df.index + pd.Timedelta(milliseconds=interval_ms - 1)
+    return df
+
+
+class CcxtSource:
+    """
+    Klines of one exchange through ccxt's async client.
+
+    A single client (and with it one pooled aiohttp session) is shared by all callers, ccxt's
+    built-in throttler spaces the requests by the exchange's rate limit and at most
+    `max_concurrency` requests are in flight at once.
+    """
+
+    def __init__(self, exchange_id: str, config: Optional[dict[str, Any]] = None, max_concurrency: int = 5):
+        """
+        :param exchange_id: ccxt exchange id, e.g. 'kraken'.
+        :param config: Extra ccxt exchange options (api keys, timeout, ...).
+        :param max_concurrency: Requests in flight at once.
+        """
+        if exchange_id not in ccxt_async.exchanges:
+            raise ValueError(f"Unknown exchange: {exchange_id}")
+
+        self.exchange_id = exchange_id
+        self.exchange: ccxt_async.Exchange = getattr(ccxt_async, exchange_id)({'enableRateLimit': True, **(config or {})})
+        self.breaker = get_breaker(self.exchange.name)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._markets_loaded: bool = False
+
+    async def _load_markets(self):
+        if not self._markets_loaded:
+            await self.exchange.load_markets()
+            self._markets_loaded = True
+
+    async def fetch_klines(self, symbol: str, interval: str, limit: int) -> pd.DataFrame:
+        """
+        Fetch the last `limit` klines (including the open one) of a unified ccxt symbol, e.g. 'BTC/USD'.
+
+        :raises ValueError: The exchange doesn't offer `interval` or `symbol`.
+        :raises CircuitOpenError: The exchange failed repeatedly and isn't called until it recovers.
+        """
+        if self.exchange.timeframes and interval not in self.exchange.timeframes:
+            raise ValueError(f"{self.exchange.name} doesn't support the {interval} interval. "
+                             f"Valid options: {', '.join(self.exchange.timeframes)}")
+
+        async with self._semaphore:
+            self.breaker.before_call()
+            try:
+                await self._load_markets()
+                ohlcv = await self.exchange.fetch_ohlcv(symbol, timeframe=interval, limit=limit)
+            except ccxt.BadSymbol as e:
+                self.breaker.record_success()  # The exchange answered, the symbol is wrong
+                raise ValueError(f"{symbol} isn't listed on {self.exchange.name}") from e
+            except (ccxt.NetworkError, ccxt.ExchangeNotAvailable):
+                self.breaker.record_failure()
+                raise
+            except Exception:
+                self.breaker.record_success()  # Any other error is an answer of the exchange
+                raise
+            self.breaker.record_success()
+
+        interval_ms: int = self.exchange.parse_timeframe(interval) * 1000
+        return normalize_ohlcv(ohlcv[-limit:], interval_ms)
+
+    async def close(self):
+        await self.exchange.close()
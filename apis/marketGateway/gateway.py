@@ -0,0 +1,88 @@
+import logging
+from typing import Any, Awaitable, Callable, Optional, Protocol
+
+import pandas as pd
+
+from .ccxtSource import CcxtSource
+
+logger = logging.getLogger("oracle.link")
+
+KlineFetcher = Callable[[str, str, int], Awaitable[pd.DataFrame]]
+SOURCE_SEPARATOR: str = ':'
+
+
+class KlineSource(Protocol):
+    """A data source owning connections, like `CcxtSource` or `AlltickSource`."""
+
+    async def fetch_klines(self, symbol: str, interval: str, limit: int) -> pd.DataFrame: ...
+
+    async def close(self): ...
+
+
+def parse_symbol(symbol: str) -> tuple[Optional[str], str]:
+    """
+    Split a watchlist entry like 'kraken:BTC/USD' into (source, symbol).
+
+    :return: Lowercase source name, None for plain symbols (served by the default source).
+    """
+    source, separator, name = symbol.partition(SOURCE_SEPARATOR)
+    if not separator:
+        return None, symbol
+    return source.lower(), name
+
+
+class MarketDataGateway:
+    """
+    Routes kline requests to the data source named in the symbol.
+
+    Plain symbols go to the default fetcher (Binance), 'source:SYMBOL' entries to a registered
+    fetcher or source (e.g. 'yahoo', 'alltick') or, for any other name, to a ccxt exchange with
+    that id. ccxt sources are created on first use and shared, so every exchange has one client and
+    session. Sources are closed with the gateway.
+    The frames are normalized like the Binance fetcher's, `fetch_klines` can be used wherever
+    a `(symbol, interval, limit)` kline fetcher is expected, e.g. by `MultiTimeframeEngine`.
+    """
+
+    def __init__(self, default_fetch: KlineFetcher, fetchers: Optional[dict[str, KlineFetcher]] = None,
+                 sources: Optional[dict[str, KlineSource]] = None,
+                 ccxt_config: Optional[dict[str, dict[str, Any]]] = None, max_concurrency: int = 5):
+        """
+        :param default_fetch: Fetcher of symbols without a source prefix.
+        :param fetchers: Fetchers by source name, take precedence over ccxt exchanges of the same name.
+        :param sources: Sources by name, like `fetchers` but closed with the gateway.
+        :param ccxt_config: ccxt options by exchange id (api keys, timeout, ...).
+        :param max_concurrency: Requests in flight at once per ccxt exchange.
+        """
+        self.default_fetch = default_fetch
+        self.fetchers: dict[str, KlineFetcher] = fetchers or {}
+        self.ccxt_config = ccxt_config or {}
+        self.max_concurrency = max_concurrency
+        self._sources: dict[str, KlineSource] = dict(sources or {})
+
+    def source(self, exchange_id: str) -> KlineSource:
+        source = self._sources.get(exchange_id)
+        if source is None:
+            logger.debug(f"Creating ccxt source for {exchange_id}")
+            source = self._sources[exchange_id] = CcxtSource(
+                exchange_id, self.ccxt_config.get(exchange_id), self.max_concurrency
+            )
+        return source
+
+    def validate(self, symbol: str):
+        """Raise ValueError if the source of `symbol` is unknown."""
+        source, _ = parse_symbol(symbol)
+        if source is not None and source not in self.fetchers:
+            self.source(source)
+
+    async def fetch_klines(self, symbol: str, interval: str, limit: int) -> pd.DataFrame:
+        source, name = parse_symbol(symbol)
+        if source is None:
+            return await self.default_fetch(name, interval, limit)
+        if source in self.fetchers:
+            return await self.fetchers[source](name, interval, limit)
+        return await self.source(source).fetch_klines(name, interval, limit)
+
+    async def close(self):
+        for source in self._sources.values():
+            await source.close()
+        self._sources.clear()
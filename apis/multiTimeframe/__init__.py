@@ -0,0 +1,2 @@
+from .engine import MultiTimeframeEngine
+from .aggregator import CandleAggregator, bucket_start
\ No newline at end of file
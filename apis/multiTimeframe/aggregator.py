@@ -0,0 +1,96 @@
+from typing import Optional, Any
+
+import pandas as pd
+
+from utils import parse_interval
+
+# Binance weeks open on Monday, the UNIX epoch was a Thursday
+WEEK_OFFSET_MS: int = 4 * 86_400_000
+SUM_COLUMNS: tuple[str, ...] = (
+    'Volume', 'Quote Asset Volume', 'Number of Trades', 'Taker Buy Base Asset Volume', 'Taker Buy Quote Asset Volume'
+)
+
+
+def interval_ms(interval: str) -> int:
+    return parse_interval(interval) * 1000
+
+
+def bucket_start(timestamp: pd.Timestamp, interval: str) -> pd.Timestamp:
+    """Return the open time of the `interval` candle containing `timestamp` (naive UTC)."""
+    offset = WEEK_OFFSET_MS if interval.endswith('w') else 0
+    step = interval_ms(interval)
+    ms = timestamp.value // 1_000_000
+    return pd.Timestamp(ms - (ms - offset) % step, unit='ms')
+
+
+class CandleAggregator:
+    """
+    Incrementally aggregates closed base candles into candles of a higher interval.
+
+    A higher candle is emitted exactly when the base candle closing its bucket is fed.
+    If the bucket wasn't covered from its first base candle (e.g. the aggregator started
+    mid-bucket or base candles were skipped) the candle is not emitted and `incomplete`
+    is set, so the caller can fall back to fetching it directly.
+    """
+
+    def __init__(self, interval: str, base_interval: str):
+        if interval_ms(interval) % interval_ms(base_interval) != 0:
+            raise ValueError(f"Interval {interval} is not a multiple of {base_interval}")
+
+        self.interval = interval
+        self.base_interval = base_interval
+        self.incomplete: bool = False
+        self._partial: Optional[dict[str, Any]] = None
+        self._partial_complete: bool = False
+        self._next_open: Optional[pd.Timestamp] = None
+
+    def reset(self):
+        self.incomplete = False
+        self._partial = None
+        self._partial_complete = False
+        self._next_open = None
+
+    def update(self, open_time: pd.Timestamp, candle: pd.Series) -> Optional[dict[str, Any]]:
+        """
+        Feed one closed base candle.
+
+        :param open_time: Open time of the base candle.
+        :param candle: Row of a kline DataFrame (Open, High, Low, Close, Volume, Close Time, ...).
+        :return: The closed higher interval candle (with 'Open Time') or None.
+        """
+        start = bucket_start(open_time, self.interval)
+
+        if self._partial is None or self._partial['Open Time'] != start:
+            self._partial = {
+                'Open Time': start,
+                'Open': float(candle['Open']),
+                'High': float(candle['High']),
+                'Low': float(candle['Low']),
+                'Close': float(candle['Close']),
+                'Close Time': start + pd.Timedelta(milliseconds=interval_ms(self.interval) - 1),
+            }
+            for column in SUM_COLUMNS:
+                if column in candle:
+                    self._partial[column] = float(candle[column])
+            self._partial_complete = open_time == start
+        else:
+            # Base candles must be contiguous, otherwise the bucket is missing data
+            if open_time != self._next_open:
+                self._partial_complete = False
+            self._partial['High'] = max(self._partial['High'], float(candle['High']))
+            self._partial['Low'] = min(self._partial['Low'], float(candle['Low']))
+            self._partial['Close'] = float(candle['Close'])
+            for column in SUM_COLUMNS:
+                if column in candle:
+                    self._partial[column] += float(candle[column])
+
+        self._next_open = open_time + pd.Timedelta(milliseconds=interval_ms(self.base_interval))
+        if self._next_open < start + pd.Timedelta(milliseconds=interval_ms(self.interval)):
+            return None
+
+        closed, complete = self._partial, self._partial_complete
+        self._partial = None
+        if not complete:
+            self.incomplete = True
+            return None
+        return closed
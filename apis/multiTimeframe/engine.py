@@ -0,0 +1,253 @@
+import asyncio
+import logging
+from collections import Counter
+from typing import Awaitable, Callable, Optional
+
+import pandas as pd
+
+from utils import utc_timestamp
+from .aggregator import CandleAggregator, bucket_start, interval_ms
+
+logger = logging.getLogger("oracle.link")
+
+# Fetches the last `limit` klines including the still open one, like `apis.binanceApi.fetch_klines`
+KlineFetcher = Callable[[str, str, int], Awaitable[pd.DataFrame]]
+CandleListener = Callable[[str, str, pd.DataFrame], None]
+
+
+def _utc_now() -> pd.Timestamp:
+    return pd.Timestamp(utc_timestamp(), unit='s')
+
+
+class _Series:
+    def __init__(self, interval: str, base_interval: str):
+        self.interval = interval
+        self.history: Optional[pd.DataFrame] = None
+        self.seeded_limit: int = 0  # Candles requested by the last seed, the exchange may have had fewer
+        self.aggregator: Optional[CandleAggregator] = (
+            CandleAggregator(interval, base_interval) if interval != base_interval else None
+        )
+
+
+class _SymbolFeed:
+    def __init__(self, base_interval: str):
+        self.base_interval = base_interval
+        self.requested_base = base_interval  # Applied by the next `get_klines`, while holding the lock
+        self.lock = asyncio.Lock()
+        self.last_base_open: Optional[pd.Timestamp] = None
+        self.series: dict[str, _Series] = {}
+
+
+class MultiTimeframeEngine:
+    """
+    Serves closed candles for every watched (symbol, interval) from a single base stream per symbol.
+
+    Only the finest registered interval of a symbol is fetched from the exchange. Higher intervals
+    are seeded once with a direct fetch and then maintained by aggregating the new base candles,
+    so every tick costs one small request per symbol no matter how many intervals or users watch it.
+    A higher candle whose bucket wasn't fully covered by base candles is re-fetched directly instead.
+    When the base interval changes, the cached candles of every interval the new base can build are kept.
+    """
+
+    def __init__(self, fetch: KlineFetcher, history_size: int = 500, seed_size: int = 100,
+                 confirm_timeout: float = 3.0, confirm_poll: float = 0.05):
+        """
+        :param fetch: Coroutine function (symbol, interval, limit) returning klines including the open candle.
+        :param history_size: Maximum number of closed candles kept per (symbol, interval).
+        :param seed_size: Minimum number of candles fetched when a series is seeded, so callers
+            asking for a slightly wider window later are still served from memory.
+        :param confirm_timeout: Seconds after a boundary during which a response without the new open
+            candle is polled again, the exchange may not have finalized the closed candle yet.
+        :param confirm_poll: First delay (seconds) between those polls, doubled after each poll.
+        """
+        self.fetch = fetch
+        self.history_size = history_size
+        self.seed_size = seed_size
+        self.confirm_timeout = confirm_timeout
+        self.confirm_poll = confirm_poll
+        self._registrations: Counter[tuple[str, str]] = Counter()
+        self._feeds: dict[str, _SymbolFeed] = {}
+        self._listeners: list[CandleListener] = []
+
+    def add_listener(self, listener: CandleListener):
+        """Call `listener(symbol, interval, candles)` with every batch of newly closed candles."""
+        self._listeners.append(listener)
+
+    def register(self, symbol: str, interval: str):
+        self._registrations[(symbol, interval)] += 1
+        self._update_base(symbol)
+
+    def unregister(self, symbol: str, interval: str):
+        key = (symbol, interval)
+        if self._registrations[key] <= 1:
+            del self._registrations[key]
+        else:
+            self._registrations[key] -= 1
+        self._update_base(symbol)
+
+    def is_registered(self, symbol: str, interval: str) -> bool:
+        return self._registrations[(symbol, interval)] > 0
+
+    def base_interval(self, symbol: str) -> Optional[str]:
+        intervals = [interval for (registered, interval) in self._registrations if registered == symbol]
+        return min(intervals, key=interval_ms, default=None)
+
+    def _update_base(self, symbol: str):
+        base = self.base_interval(symbol)
+        feed = self._feeds.get(symbol)
+        if base is None:
+            self._feeds.pop(symbol, None)
+        elif feed is None:
+            self._feeds[symbol] = _SymbolFeed(base)
+        elif feed.requested_base != base:
+            logger.debug(f"Base interval of {symbol} is now {base}")
+            feed.requested_base = base
+
+    async def get_klines(self, symbol: str, interval: str, limit: int) -> pd.DataFrame:
+        """
+        Return the last `limit` closed candles of `symbol` in `interval`.
+
+        Symbols or intervals that weren't registered are fetched directly.
+        """
+        feed = self._feeds.get(symbol)
+        if feed is None or interval_ms(interval) % interval_ms(feed.requested_base) != 0:
+            return await self._fetch_closed(symbol, interval, limit)
+
+        async with feed.lock:
+            if feed.base_interval != feed.requested_base:
+                self._migrate(symbol, feed)
+            await self._refresh_base(symbol, feed)
+
+            series = feed.series.get(interval)
+            if series is None:
+                series = feed.series[interval] = _Series(interval, feed.base_interval)
+
+            if (series.history is None or series.seeded_limit < limit or
+                    (series.aggregator is not None and series.aggregator.incomplete)):
+                await self._seed(symbol, feed, series, limit)
+
+            return series.history.iloc[-limit:]
+
+    def _migrate(self, symbol: str, feed: _SymbolFeed):
+        """Switch `feed` to its requested base interval, keeping the history of every series it can still build."""
+        base_interval = feed.base_interval = feed.requested_base
+        feed.series = {interval: series for interval, series in feed.series.items()
+                       if interval_ms(interval) % interval_ms(base_interval) == 0}
+        for series in feed.series.values():
+            series.aggregator = (CandleAggregator(series.interval, base_interval)
+                                 if series.interval != base_interval else None)
+
+        base = feed.series.get(base_interval)
+        if base is None or base.history is None or base.history.empty:
+            feed.last_base_open = None  # Seeded by `_refresh_base`, which then catches up the other series
+            return
+        feed.last_base_open = base.history.index[-1]
+        self._catch_up(symbol, feed)
+
+    def _catch_up(self, symbol: str, feed: _SymbolFeed):
+        """Feed the cached base candles after the last closed candle of every aggregated series."""
+        base = feed.series[feed.base_interval]
+        for series in feed.series.values():
+            if series.aggregator is None or series.history is None or series.history.empty:
+                continue
+            next_open = series.history['Close Time'].iloc[-1] + pd.Timedelta(milliseconds=1)
+            self._append(symbol, series, base.history[base.history.index >= next_open])
+
+    def _append(self, symbol: str, series: _Series, candles: pd.DataFrame):
+        """Add the candles closed by the new base `candles` to `series` and notify the listeners."""
+        if series.aggregator is None:
+            closed = candles
+        else:
+            rows = []
+            for open_time, candle in candles.iterrows():
+                aggregated = series.aggregator.update(open_time, candle)
+                if aggregated is not None:
+                    rows.append(aggregated)
+            if not rows:
+                return
+            closed = pd.DataFrame(rows).set_index('Open Time')
+
+        if not series.history.empty:
+            closed = closed[closed.index > series.history.index[-1]]
+        if closed.empty:
+            return
+        series.history = pd.concat([series.history, closed]).iloc[-self.history_size:]
+        for listener in self._listeners:
+            listener(symbol, series.interval, closed)
+
+    async def _fetch_closed(self, symbol: str, interval: str, limit: int) -> pd.DataFrame:
+        delay = self.confirm_poll
+        polls = 1
+        while True:
+            df = await self.fetch(symbol, interval, limit + 1)
+            now = _utc_now()
+            if df.empty:
+                return df
+
+            # Until the exchange opened the next candle, the one that just ended may still miss trades
+            since_close = (now - df['Close Time'].iloc[-1]).total_seconds()
+            if not 0 < since_close < self.confirm_timeout:
+                break
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.5)
+            polls += 1
+
+        if polls > 1:
+            logger.debug(f"Close of {symbol} {interval} confirmed after {polls} polls")
+        return df[df['Close Time'] < now].iloc[-limit:]
+
+    async def _seed(self, symbol: str, feed: _SymbolFeed, series: _Series, limit: int):
+        logger.debug(f"Seeding {symbol} {series.interval} with {limit} candles")
+        series.seeded_limit = min(max(limit, self.seed_size, 2), self.history_size)
+        series.history = await self._fetch_closed(symbol, series.interval, series.seeded_limit)
+
+        if series.aggregator is None:
+            if not series.history.empty:
+                feed.last_base_open = max(feed.last_base_open or series.history.index[-1], series.history.index[-1])
+            return
+
+        # Replay the base candles of the bucket that is currently open, if we still have them
+        series.aggregator.reset()
+        base = feed.series[feed.base_interval]
+        if base.history is None or base.history.empty:
+            return
+        current_start = bucket_start(base.history.index[-1], series.interval)
+        for open_time, candle in base.history[base.history.index >= current_start].iterrows():
+            series.aggregator.update(open_time, candle)
+
+    async def _refresh_base(self, symbol: str, feed: _SymbolFeed):
+        base_ms = interval_ms(feed.base_interval)
+        base = feed.series.get(feed.base_interval)
+        if base is None:
+            base = feed.series[feed.base_interval] = _Series(feed.base_interval, feed.base_interval)
+
+        if base.history is None or feed.last_base_open is None:
+            # Keep enough base candles to replay the open bucket of the largest watched interval
+            ratios = [interval_ms(interval) // base_ms for (registered, interval) in self._registrations
+                      if registered == symbol]
+            await self._seed(symbol, feed, base, min(max(ratios, default=2), self.history_size))
+            self._catch_up(symbol, feed)  # Series kept from before a base interval change
+            return
+
+        now = _utc_now()
+        last_closed_open = bucket_start(now, feed.base_interval) - pd.Timedelta(milliseconds=base_ms)
+        if feed.last_base_open is not None and feed.last_base_open >= last_closed_open:
+            return  # Up to date for this boundary
+
+        missing = int((last_closed_open - feed.last_base_open) / pd.Timedelta(milliseconds=base_ms))
+        if missing > self.history_size:
+            logger.info(f"Lost track of {symbol} ({missing} base candles missing), reseeding all intervals")
+            feed.series.clear()
+            feed.last_base_open = None
+            await self._refresh_base(symbol, feed)
+            return
+
+        candles = await self._fetch_closed(symbol, feed.base_interval, missing)
+        candles = candles[candles.index > feed.last_base_open]
+        if candles.empty:
+            return
+
+        feed.last_base_open = candles.index[-1]
+        for series in feed.series.values():
+            if series.history is not None:
+                self._append(symbol, series, candles)
@@ -1 +1 @@
-from .fetcher import fetch_klines
\ No newline at end of file
+from .fetcher import fetch_klines, fetch_klines_async
\ No newline at end of file
@@ -1,17 +1,103 @@
+import asyncio
+import threading
 import pandas as pd
 import yfinance as yf
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import logging
 
-from pandas import Timestamp
+from apis.circuitBreaker import get_breaker
+from utils import parse_interval
 
 logger = logging.getLogger("oracle.link")
+# Failed downloads count as failures. Empty ones don't, one mistyped or delisted ticker would pause every Yahoo alert
+breaker = get_breaker('Yahoo Finance', failure_threshold=5, recovery_timeout=60)
+
+# Candle length in seconds of every supported yfinance interval
+INTERVAL_SECONDS: dict[str, int] = {
+    '1m': 60, '2m': 120, '5m': 300, '15m': 900, '30m': 1800, '60m': 3600, '90m': 5400, '1h': 3600,
+    '1d': 86400, '5d': 432000, '1wk': 604800, '1mo': 2629800, '3mo': 7889400,
+}
+INTERVAL_ALIASES: dict[str, str] = {'1w': '1wk', '1M': '1mo'}  # Binance style names used by the bot
+# Intervals Yahoo doesn't serve, aggregated from a finer one in UTC buckets like Binance's
+AGGREGATED_INTERVALS: dict[str, str] = {'4h': '1h'}
+# How far back Yahoo serves intraday data
+MAX_HISTORY: dict[str, timedelta] = {
+    '1m': timedelta(days=7), '2m': timedelta(days=59), '5m': timedelta(days=59), '15m': timedelta(days=59),
+    '30m': timedelta(days=59), '90m': timedelta(days=59), '60m': timedelta(days=729), '1h': timedelta(days=729),
+}
+CACHE_SIZE: int = 1000  # Candles kept per (ticker, interval)
+
+_cache: dict[tuple[str, str], pd.DataFrame] = {}
+_locks: dict[tuple[str, str], threading.Lock] = {}
+_locks_lock = threading.Lock()
+
+
+def _trading_share(symbol: str, interval: str) -> float:
+    """Rough share of calendar time the market of `symbol` produces candles in."""
+    intraday = INTERVAL_SECONDS[interval] < 86400
+    if symbol.endswith('-USD') or symbol.endswith('-USDT'):  # Crypto, around the clock
+        return 1.0
+    if symbol.endswith('=X'):  # Forex, 24/5
+        return 5 / 7
+    if symbol.endswith('=F'):  # Futures, ~23/5
+        return 5 / 7 * (23 / 24 if intraday else 1)
+    return 5 / 7 * (6.5 / 24 if intraday else 1)  # Stocks, regular session only
+
+
+def _range_start(symbol: str, interval: str, limit: int, now: datetime) -> datetime:
+    """Earliest start that still covers `limit` candles, including weekends and a few holidays."""
+    span = timedelta(seconds=limit * INTERVAL_SECONDS[interval] / _trading_share(symbol, interval) * 1.25)
+    if _trading_share(symbol, interval) < 1:
+        span += timedelta(days=4)
+    max_history = MAX_HISTORY.get(interval)
+    if max_history is not None:
+        span = min(span, max_history)
+    return now - span
+
+
+def _download(symbol: str, interval: str, start: datetime, end: datetime) -> pd.DataFrame:
+    breaker.before_call()
+    try:
+        data = yf.download(tickers=symbol, start=start, end=end, interval=interval,
+                           progress=False, threads=False, auto_adjust=True)
+    except Exception:
+        breaker.record_failure()
+        raise
+    if data is None or data.empty:  # Unknown ticker, or no new bars while the market is closed
+        return pd.DataFrame(columns=['Open', 'High', 'Low', 'Close', 'Volume', 'Close Time'])
+    breaker.record_success()
+
+    if isinstance(data.columns, pd.MultiIndex):
+        data.columns = [col[0] for col in data.columns]  # Flatten, due to multilevel return values
+
+    # Same shape as the Binance fetcher: naive UTC 'Open Time' index and a 'Close Time' column
+    index = pd.DatetimeIndex(data.index)
+    if index.tz is not None:
+        index = index.tz_convert('UTC').tz_localize(None)
+    data.index = index.rename('Open Time')
+    data = data[['Open', 'High', 'Low', 'Close', 'Volume']].astype(float)
+    data['Close Time'] = data.index + pd.Timedelta(seconds=INTERVAL_SECONDS[interval]) - pd.Timedelta(milliseconds=1)
+    return data
+
+
+def _aggregate(df: pd.DataFrame, interval: str) -> pd.DataFrame:
+    """Aggregate klines into `interval` candles opening at multiples of the interval since the epoch (UTC)."""
+    step = pd.Timedelta(seconds=parse_interval(interval))
+    aggregated = df.groupby(df.index.floor(step)).agg(
+        {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+    )
+    aggregated.index.name = 'Open Time'
+    aggregated['Close Time'] = aggregated.index + step - pd.Timedelta(milliseconds=1)
+    return aggregated
 
 
 def fetch_klines(symbol: str, interval: str, limit: int) -> pd.DataFrame:
     """
     Fetches historical kline (candlestick) data from Yahoo Finance.
-    Mimics the output structure of the original Binance function for core OHLCV columns.
+    Mimics the output structure of the Binance fetcher for core OHLCV columns.
+
+    Only the range needed for `limit` candles is downloaded. Results are cached per
+    (ticker, interval), later calls only download the bars since the last cached one.
 
     Parameters:
     - ticker (str): Ticker symbol compatible with Yahoo Finance
@@ -21,91 +107,75 @@ def fetch_klines(symbol: str, interval: str, limit: int) -> pd.DataFrame:
                         (Note: Intraday data availability varies, often limited
                          to the last 60 days, '1h' up to 730 days).
                       Daily/Weekly/Monthly: '1d', '5d', '1wk', '1mo', '3mo'
+                      '4h' is aggregated from '1h' bars.
                       Check yfinance documentation for full list and limitations.
     - limit (int): Number of *most recent* data points (candles) to retrieve.
 
     Returns:
-    - pd.DataFrame: DataFrame containing Open, High, Low, Close, Volume,
-                    with 'Open Time' (datetime) as the index.
-                    Returns an empty DataFrame if data fetching fails or no data is found.
-    """
+    - pd.DataFrame: DataFrame containing Open, High, Low, Close, Volume and Close Time,
+                    with 'Open Time' (naive UTC datetime) as the index. The last candle
+                    may still be open.
 
-    valid_intervals = ['1m', '2m', '5m', '15m', '30m', '60m', '90m', '1h',
-                       '1d', '5d', '1wk', '1mo', '3mo']
-    if interval not in valid_intervals:
+    Raises:
+    - ValueError: Invalid interval, or Yahoo Finance has no data for `symbol`.
+    - CircuitOpenError: Yahoo Finance failed repeatedly and isn't called until it recovers.
+    """
+    base_interval = AGGREGATED_INTERVALS.get(interval)
+    if base_interval is not None:
+        ratio = parse_interval(interval) // INTERVAL_SECONDS[base_interval]
+        # Every bucket holds at most `ratio` bars, one more bucket for the open one
+        return _aggregate(fetch_klines(symbol, base_interval, (limit + 1) * ratio), interval).iloc[-limit:]
+
+    interval = INTERVAL_ALIASES.get(interval, interval)
+    if interval not in INTERVAL_SECONDS:
         raise ValueError(f"Invalid interval: {interval}. Please use a valid yfinance interval.")
 
-    period_to_fetch = None
-    start_date = None
-    end_date = datetime.now()
-
-    intraday_short_limit = ['2m', '5m', '15m', '30m'] # Typically limited to 60 days
-    intraday_medium_limit = ['60m', '90m', '1h'] # Typically limited to 730 days
-
-    if interval == '1m':
-         period_to_fetch = '7d'  # Yahoo Finance limits 1m data to 8 days, use 7 for safety
-    elif interval in intraday_short_limit:
-         period_to_fetch = '60d'
-    elif interval in intraday_medium_limit:
-         period_to_fetch = '730d'
-    else:
-        buffer_multiplier = 1.7 # ~7/4, covers weekends for daily/weekly etc.
-        delta_unit = None
-        if interval == '1d':
-             delta_unit = timedelta(days=int(limit * buffer_multiplier))
-        elif interval == '5d' or interval == '1wk':
-             delta_unit = timedelta(weeks=int(limit * buffer_multiplier))
-        elif interval == '1mo':
-             delta_unit = timedelta(days=int(limit * buffer_multiplier * 30.5))
-        elif interval == '3mo':
-             delta_unit = timedelta(days=int(limit * buffer_multiplier * 91.5))
-
-        if delta_unit:
-            start_date = (end_date - delta_unit).strftime('%Y-%m-%d')
+    key = (symbol, interval)
+    with _locks_lock:
+        lock = _locks.setdefault(key, threading.Lock())
+
+    with lock:
+        # yfinance reads naive datetimes as exchange time, always pass aware UTC ones
+        now = datetime.now(timezone.utc)
+        step = timedelta(seconds=INTERVAL_SECONDS[interval])
+        cached = _cache.get(key)
+
+        if cached is not None and len(cached) >= limit:
+            last_open = cached.index[-1].tz_localize('UTC').to_pydatetime()
+            if now < last_open + step:
+                return cached.iloc[-limit:]  # No candle closed since the last download
+
+            # Re-download the last cached bar as well, it may have been incomplete
+            logger.debug(f"Topping up {symbol} ({interval}) since {last_open}")
+            new = _download(symbol, interval, last_open, now + step)
+            cached = pd.concat([cached[cached.index < cached.index[-1]], new]) if not new.empty else cached
         else:
-            period_to_fetch = 'max' # Fetch all available history
-            logger.warning(f"Warning: Could not determine optimal fetch period for interval '{interval}'. Fetching 'max'.")
+            start = _range_start(symbol, interval, limit, now)
+            logger.debug(f"Fetching {symbol} data: Interval={interval}, Limit={limit}, Start='{start}'")
+            cached = _download(symbol, interval, start, now + step)
 
+            # Fewer bars than expected (holidays, halts), widen once to the maximum range
+            max_history = MAX_HISTORY.get(interval)
+            if len(cached) < limit and max_history is not None and now - start < max_history:
+                cached = _download(symbol, interval, now - max_history, now + step)
 
-    # --- Fetch Data ---
-    logger.debug(f"Fetching {symbol} data: Interval={interval}, Limit={limit} (Derived Period='{period_to_fetch}', Start='{start_date}')")
-    try:
-        if period_to_fetch:
-            data = yf.download(
-                tickers=symbol,
-                period=period_to_fetch,
-                interval=interval,
-            )
-        elif start_date:
-            data = yf.download(
-                tickers=symbol,
-                start=start_date,
-                end=end_date.strftime('%Y-%m-%d'),
-                interval=interval,
-            )
-        else:
-            logger.warning(f"Warning: Could not determine optimal fetch period for interval '{interval}'. Fetching 'max'")
-            data = yf.download(symbol, interval=interval)
-
-        # --- Process Data ---
-        if data is None or data.empty:
+        if cached.empty:
             logger.error(f"Failed to fetch valid data for {symbol}. Got empty or insufficient data.")
-            raise Exception(f"Failed to fetch {symbol} data: insufficient data points")
+            raise ValueError(f"No Yahoo Finance data for {symbol}, check the ticker")
 
-        if isinstance(data.columns, pd.MultiIndex):
-            data.columns = [col[0] for col in data.columns]  # Flatten, due to multilevel return values
-        
-        data = data.tail(limit)
-        return data
+        cached = cached[~cached.index.duplicated(keep='last')].iloc[-max(limit, CACHE_SIZE):]
+        _cache[key] = cached
+        return cached.iloc[-limit:]
 
-    except Exception as e:
-        logger.error(f"Error fetching data for {symbol}: {str(e)}")
-        raise
+
+async def fetch_klines_async(symbol: str, interval: str, limit: int) -> pd.DataFrame:
+    """`fetch_klines` off the event loop."""
+    return await asyncio.to_thread(fetch_klines, symbol, interval, limit)
 
 
 if __name__ == '__main__':
     # Test with BTC-USD to match Binance format
-    from pandas import to_timedelta
     print("--- Testing BTC-USD 1m data ---")
     df = fetch_klines(symbol='BTC-USD', interval='1m', limit=75)
-    print(df.iloc[-1].index[-1])
+    print(df.tail())
+    print(fetch_klines(symbol='BTC-USD', interval='1m', limit=75).index[-1])
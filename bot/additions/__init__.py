@@ -1 +1,8 @@
-from .filteredPersitence import FilteredPersistence
\ No newline at end of file
+from .filteredPersitence import FilteredPersistence
+from .chartCache import ChartCache
+from .webhook import WebhookConfig, UserSerializedUpdateProcessor
+from .memoryMonitor import MemoryMonitor
+from .priceAlerts import PriceAlertIndex
+from .signalStore import SignalStore
+from .signalHistory import SignalHistory
+from .alertDigest import AlertDigest, SharedChart
\ No newline at end of file
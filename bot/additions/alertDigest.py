@@ -0,0 +1,139 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from io import BytesIO
+from typing import Optional
+
+from telegram import Bot, InputMediaPhoto, Message
+
+logger = logging.getLogger("oracle.link")
+
+ALBUM_SIZE: int = 10  # Most photos Telegram accepts per media group
+CAPTION_LIMIT: int = 1024
+
+
+@dataclass
+class SharedChart:
+    """A chart several chats get: uploaded with the first message that sends it, then reused by its file id."""
+    data: bytes
+    file_id: Optional[str] = None
+
+    @property
+    def photo(self) -> bytes | str:
+        return self.file_id or self.data
+
+    def sent(self, message: Message):
+        if self.file_id is None:
+            self.file_id = message.photo[-1].file_id
+
+
+# (title, caption, photo as buffer, bytes, file id or shared chart)
+Alert = tuple[str, str, BytesIO | bytes | str | SharedChart]
+
+
+@dataclass
+class _Batch:
+    alerts: list[Alert] = field(default_factory=list)
+    pending: int = 0
+    joined: int = 0  # Jobs that called `begin`, to notice jobs that started and finished within the grace
+    idle: asyncio.Event = field(default_factory=asyncio.Event)
+    closed: bool = False
+
+
+class AlertDigest:
+    """
+    Collects the chart alerts a chat gets at one boundary and sends them as albums.
+
+    Every job of a digest chat calls `begin` when it starts and `finish` with its alert (or None)
+    when it's done. Once no job of the chat has been started or running for `grace` seconds, or after
+    `max_wait` seconds at the latest, the collected alerts are sent with `send`: up to `ALBUM_SIZE`
+    charts per `send_media_group` call, a single alert as a normal photo. Alerts of jobs that
+    finish after their batch was sent are sent on their own.
+    """
+
+    def __init__(self, grace: float = 0.5, max_wait: float = 20):
+        """
+        :param grace: Seconds to wait for further jobs of the chat after the last one finished.
+        :param max_wait: Seconds after which a batch is sent even if jobs of the chat are still running.
+        """
+        self.grace = grace
+        self.max_wait = max_wait
+        self._batches: dict[int, _Batch] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def begin(self, bot: Bot, chat_id: int) -> _Batch:
+        """Join the open batch of `chat_id`, or open one. Must be followed by `finish`."""
+        batch = self._batches.get(chat_id)
+        if batch is None:
+            batch = self._batches[chat_id] = _Batch()
+            task = asyncio.create_task(self._deliver(bot, chat_id, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        batch.pending += 1
+        batch.joined += 1
+        batch.idle.clear()
+        return batch
+
+    async def finish(self, bot: Bot, chat_id: int, batch: _Batch, alert: Optional[Alert]):
+        batch.pending -= 1
+        if batch.pending == 0:
+            batch.idle.set()
+        if alert is None:
+            return
+        if batch.closed:
+            await self.send(bot, chat_id, [alert])
+            return
+        batch.alerts.append(alert)
+
+    async def _deliver(self, bot: Bot, chat_id: int, batch: _Batch):
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while True:
+            try:
+                await asyncio.wait_for(batch.idle.wait(), deadline - asyncio.get_running_loop().time())
+            except TimeoutError:
+                logger.debug(f"Digest of {chat_id} sent with {batch.pending} jobs still running")
+                break
+            joined = batch.joined
+            await asyncio.sleep(self.grace)
+            if batch.pending == 0 and batch.joined == joined:
+                break
+
+        batch.closed = True
+        del self._batches[chat_id]
+        if batch.alerts:
+            try:
+                await self.send(bot, chat_id, batch.alerts)
+            except Exception as e:
+                logger.warning(f"Failed to send the digest of {len(batch.alerts)} alerts to {chat_id}: {e}")
+
+    @staticmethod
+    async def send(bot: Bot, chat_id: int, alerts: list[Alert]) -> list[Message]:
+        """
+        Send `alerts` as albums of up to `ALBUM_SIZE` charts, the first caption lists all of them.
+
+        :return: The sent messages in the order of `alerts`.
+        """
+        messages: list[Message] = []
+        for start in range(0, len(alerts), ALBUM_SIZE):
+            album = alerts[start:start + ALBUM_SIZE]
+            if len(album) == 1:
+                title, caption, photo = album[0]
+                sent = [await bot.send_photo(chat_id=chat_id, photo=_photo(photo), caption=caption)]
+            else:
+                summary = f"📦 {len(album)} alerts: {', '.join(title for title, _, _ in album)}\n\n"
+                media = [
+                    InputMediaPhoto(media=_photo(photo),
+                                    caption=((summary if index == 0 else "") + caption)[:CAPTION_LIMIT])
+                    for index, (title, caption, photo) in enumerate(album)
+                ]
+                sent = await bot.send_media_group(chat_id=chat_id, media=media)
+
+            for (_, _, photo), message in zip(album, sent):
+                if isinstance(photo, SharedChart):
+                    photo.sent(message)
+            messages.extend(sent)
+        return messages
+
+
+def _photo(photo: BytesIO | bytes | str | SharedChart) -> BytesIO | bytes | str:
+    return photo.photo if isinstance(photo, SharedChart) else photo
@@ -0,0 +1,49 @@
+from collections import OrderedDict
+from itertools import count
+from typing import Optional, Any
+
+
+class ChartCache:
+    """
+    Bounded LRU store for charts that were announced but not rendered yet.
+
+    Each entry keeps the data needed to render the chart later (or the photo a worker already
+    rendered) and, once it was sent, the Telegram `file_id` of the photo so repeated taps don't
+    render again.
+    """
+
+    def __init__(self, max_entries: int = 500):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._ids = count(1)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def put(self, render_kwargs: Optional[dict[str, Any]] = None, photo: Optional[bytes] = None) -> str:
+        """
+        Store the arguments for a later render, or a chart that was rendered already.
+
+        :param render_kwargs: Keyword arguments for the chart renderer (df, peaks, valleys, ...).
+        :param photo: Encoded chart, used instead of `render_kwargs`.
+        :return: Short id that fits into Telegram callback data.
+        """
+        chart_id = format(next(self._ids), 'x')
+        self._entries[chart_id] = {'render_kwargs': render_kwargs, 'photo': photo, 'file_id': None}
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return chart_id
+
+    def get(self, chart_id: str) -> Optional[dict[str, Any]]:
+        entry = self._entries.get(chart_id)
+        if entry is not None:
+            self._entries.move_to_end(chart_id)
+        return entry
+
+    def set_file_id(self, chart_id: str, file_id: str):
+        """Remember the uploaded photo and drop the render data, it isn't needed anymore."""
+        entry = self._entries.get(chart_id)
+        if entry is not None:
+            entry['file_id'] = file_id
+            entry['render_kwargs'] = None
+            entry['photo'] = None
@@ -0,0 +1,173 @@
+import asyncio
+import gc
+import logging
+import os
+import resource
+import sys
+import time
+import tracemalloc
+from typing import Any, Optional
+
+from telegram.ext import ContextTypes
+
+logger = logging.getLogger("oracle.link")
+
+# Allocations of the import machinery and of tracemalloc itself are noise in every diff
+_IGNORED_TRACES: tuple[tracemalloc.Filter, ...] = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+
+def current_rss() -> int:
+    """Resident set size in bytes, the peak RSS where /proc isn't available."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def live_figure_counts() -> dict[str, int]:
+    """Figures registered in pyplot (never closed ones leak) and all Figure objects still alive."""
+    pyplot = sys.modules.get('matplotlib.pyplot')
+    figure_module = sys.modules.get('matplotlib.figure')
+    return {
+        'pyplot': len(pyplot.get_fignums()) if pyplot is not None else 0,
+        'total': sum(isinstance(obj, figure_module.Figure) for obj in gc.get_objects()) if figure_module else 0,
+    }
+
+
+class MemoryMonitor:
+    """
+    Opt-in memory instrumentation for long-running bots.
+
+    Takes a tracemalloc snapshot every `interval` seconds and logs the allocation sites that grew the
+    most since the previous snapshot and since the first one, next to the RSS, the traced memory and
+    the number of live matplotlib figures. Tracing slows allocations down, so only enable it while
+    hunting growth.
+    """
+
+    def __init__(self, interval: float = 600, top: int = 10, frames: int = 5, chart_renderer=None):
+        """
+        :param interval: Seconds between snapshots.
+        :param top: Number of allocation sites reported per diff.
+        :param frames: Stack frames stored per allocation, more frames give better sites but cost memory.
+        :param chart_renderer: `ChartRenderer` whose cached templates and encoding stats are reported as well.
+        """
+        self.interval = interval
+        self.top = top
+        self.frames = frames
+        self.chart_renderer = chart_renderer
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._previous: Optional[tracemalloc.Snapshot] = None
+        self._baseline_rss: int = 0
+        self._started_at: float = 0
+        self.last_report: Optional[dict[str, Any]] = None
+
+    @property
+    def running(self) -> bool:
+        return self._baseline is not None
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        self._baseline = self._previous = self._take_snapshot()
+        self._baseline_rss = current_rss()
+        self._started_at = time.monotonic()
+        logger.info(f"Memory monitor started, snapshots every {self.interval}s")
+
+    def stop(self):
+        tracemalloc.stop()
+        self._baseline = self._previous = None
+
+    @staticmethod
+    def _take_snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(_IGNORED_TRACES)
+
+    def _top_growth(self, snapshot: tracemalloc.Snapshot, reference: tracemalloc.Snapshot) -> list[dict[str, Any]]:
+        stats = snapshot.compare_to(reference, 'lineno')
+        stats = sorted((stat for stat in stats if stat.size_diff > 0), key=lambda stat: stat.size_diff, reverse=True)
+        return [
+            {
+                'site': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                'size_diff': stat.size_diff,
+                'count_diff': stat.count_diff,
+                'size': stat.size,
+            }
+            for stat in stats[:self.top]
+        ]
+
+    def snapshot(self, update_previous: bool = True) -> dict[str, Any]:
+        """
+        Take a snapshot and return the report, see `format_report`. Blocks for a while, run it in a thread.
+
+        :param update_previous: Make this snapshot the reference of the next 'since_previous' diff.
+            False for on-demand reports, so the periodic reports keep diffing against each other.
+        """
+        if not self.running:
+            raise RuntimeError("Memory monitor isn't running, call start() first")
+
+        gc.collect()  # Only report what survives a collection
+        snapshot = self._take_snapshot()
+        traced, traced_peak = tracemalloc.get_traced_memory()
+        rss = current_rss()
+
+        report = {
+            'uptime': time.monotonic() - self._started_at,
+            'rss': rss,
+            'rss_growth': rss - self._baseline_rss,
+            'traced': traced,
+            'traced_peak': traced_peak,
+            'figures': live_figure_counts(),
+            'chart_templates': self.chart_renderer.template_count if self.chart_renderer is not None else None,
+            'chart_encoding': self.chart_renderer.encoding_stats if self.chart_renderer is not None else None,
+            'gc_objects': len(gc.get_objects()),
+            'since_previous': self._top_growth(snapshot, self._previous),
+            'since_start': self._top_growth(snapshot, self._baseline),
+        }
+        if update_previous:
+            self._previous = snapshot
+        self.last_report = report
+        return report
+
+    @staticmethod
+    def format_report(report: dict[str, Any]) -> str:
+        def mb(size: int) -> str:
+            return f"{size / 1024 / 1024:+.2f} MB" if abs(size) >= 1024 * 1024 else f"{size / 1024:+.1f} KB"
+
+        lines = [
+            f"Uptime: {report['uptime'] / 3600:.1f}h",
+            f"RSS: {report['rss'] / 1024 / 1024:.1f} MB ({mb(report['rss_growth'])} since start)",
+            f"Traced: {report['traced'] / 1024 / 1024:.1f} MB (peak {report['traced_peak'] / 1024 / 1024:.1f} MB)",
+            f"Figures: {report['figures']['pyplot']} pyplot / {report['figures']['total']} alive",
+            f"GC objects: {report['gc_objects']}",
+        ]
+        if report['chart_templates'] is not None:
+            lines.append(f"Chart templates: {report['chart_templates']}")
+        encoding = report.get('chart_encoding')
+        if encoding and encoding['charts']:
+            lines.append(f"Charts encoded: {encoding['charts']}, avg {encoding['average_bytes'] / 1024:.0f} KB, "
+                         f"{encoding['attempts_per_chart']:.2f} attempts, {encoding['over_budget']} over budget, "
+                         f"{encoding['encode_seconds'] / encoding['charts'] * 1000:.0f} ms each")
+            last = encoding['last']
+            lines.append(f"Last chart: {last['format']} {last['dpi']} dpi, quality {last['quality'] or '-'}, "
+                         f"{last['palette_colors'] or 'full'} colors, {last['bytes'] / 1024:.0f} KB")
+
+        for title, key in (("Top growth since last snapshot", 'since_previous'), ("Top growth since start", 'since_start')):
+            lines.append(f"\n{title}:")
+            if not report[key]:
+                lines.append("  none")
+            for stat in report[key]:
+                lines.append(f"  {mb(stat['size_diff'])} ({stat['count_diff']:+} blocks) {stat['site']}")
+        return '\n'.join(lines)
+
+    async def job(self, context: ContextTypes.DEFAULT_TYPE):
+        """Job queue callback logging a report every `interval` seconds."""
+        report = await asyncio.to_thread(self.snapshot)
+        logger.info(f"Memory report\n{self.format_report(report)}")
+        if report['figures']['pyplot']:
+            logger.warning(f"{report['figures']['pyplot']} matplotlib figures are still open in pyplot")
@@ -0,0 +1,127 @@
+import math
+import time
+from bisect import bisect_left, bisect_right
+from itertools import count
+from typing import Any, Optional
+
+ABOVE: str = 'above'
+BELOW: str = 'below'
+
+
+class _SymbolAlerts:
+    """Thresholds of one symbol, kept sorted by price so a price only touches the crossed alerts."""
+
+    def __init__(self):
+        # (price, alert_id) ascending; parallel price lists for bisect on plain floats
+        self.above_prices: list[float] = []
+        self.above_ids: list[int] = []
+        self.below_prices: list[float] = []
+        self.below_ids: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self.above_ids) + len(self.below_ids)
+
+    def add(self, direction: str, price: float, alert_id: int):
+        prices, ids = (self.above_prices, self.above_ids) if direction == ABOVE else (self.below_prices, self.below_ids)
+        position = bisect_right(prices, price)
+        prices.insert(position, price)
+        ids.insert(position, alert_id)
+
+    def remove(self, direction: str, price: float, alert_id: int):
+        prices, ids = (self.above_prices, self.above_ids) if direction == ABOVE else (self.below_prices, self.below_ids)
+        position = bisect_left(prices, price)
+        while ids[position] != alert_id:  # Same price, different alert
+            position += 1
+        del prices[position]
+        del ids[position]
+
+    def pop_crossed(self, high: float, low: float) -> list[int]:
+        """Remove and return the alerts crossed by a price range, O(log n + k)."""
+        above_end = bisect_right(self.above_prices, high)  # threshold <= high
+        below_start = bisect_left(self.below_prices, low)  # threshold >= low
+        triggered = self.above_ids[:above_end] + self.below_ids[below_start:]
+        del self.above_prices[:above_end], self.above_ids[:above_end]
+        del self.below_prices[below_start:], self.below_ids[below_start:]
+        return triggered
+
+
+class PriceAlertIndex:
+    """
+    One-shot price level alerts of all users, indexed per symbol.
+
+    `check` takes a price (or the high and low of a candle) and returns every alert it crossed,
+    so a tick costs a bisect per direction plus the triggered alerts, no matter how many are waiting.
+    """
+
+    def __init__(self, alerts: Optional[dict[int, dict[str, Any]]] = None, max_alerts_per_user: int = 50):
+        """
+        :param alerts: Alerts by id, kept up to date in place, e.g. a dict stored in bot_data so the
+            alerts are persisted with it. The index is rebuilt from the alerts it already contains.
+        :param max_alerts_per_user: Alerts a single user may have at once.
+        """
+        self.max_alerts_per_user = max_alerts_per_user
+        self.alerts: dict[int, dict[str, Any]] = alerts if alerts is not None else {}
+        self._symbols: dict[str, _SymbolAlerts] = {}
+        for alert in self.alerts.values():
+            self._index(alert)
+        self._ids = count(max(self.alerts, default=0) + 1)
+
+    def __len__(self) -> int:
+        return len(self.alerts)
+
+    @property
+    def symbols(self) -> list[str]:
+        return [symbol for symbol, alerts in self._symbols.items() if len(alerts)]
+
+    def add(self, user_id: int, chat_id: int, symbol: str, direction: str, price: float) -> dict[str, Any]:
+        if direction not in (ABOVE, BELOW):
+            raise ValueError(f"Direction must be '{ABOVE}' or '{BELOW}', got '{direction}'")
+        if not math.isfinite(price):
+            raise ValueError(f"Price must be a finite number, got {price}")
+        if len(self.user_alerts(user_id)) >= self.max_alerts_per_user:
+            raise ValueError(f"Limit of {self.max_alerts_per_user} alerts reached")
+
+        alert = {'id': next(self._ids), 'user_id': user_id, 'chat_id': chat_id, 'symbol': symbol,
+                 'direction': direction, 'price': price, 'created_at': time.time()}
+        self.alerts[alert['id']] = alert
+        self._index(alert)
+        return alert
+
+    def _index(self, alert: dict[str, Any]):
+        self._symbols.setdefault(alert['symbol'], _SymbolAlerts()).add(alert['direction'], alert['price'], alert['id'])
+
+    def remove(self, alert_id: int, user_id: Optional[int] = None) -> Optional[dict[str, Any]]:
+        """Remove an alert, only if it belongs to `user_id` when given."""
+        alert = self.alerts.get(alert_id)
+        if alert is None or (user_id is not None and alert['user_id'] != user_id):
+            return None
+        del self.alerts[alert_id]
+        self._symbols[alert['symbol']].remove(alert['direction'], alert['price'], alert_id)
+        return alert
+
+    def user_alerts(self, user_id: int) -> list[dict[str, Any]]:
+        return [alert for alert in self.alerts.values() if alert['user_id'] == user_id]
+
+    def check(self, symbol: str, high: float, low: Optional[float] = None,
+              opened_at: Optional[float] = None) -> list[dict[str, Any]]:
+        """
+        Trigger the alerts of `symbol` crossed by a price or a candle.
+
+        :param high: Last price, or the high of a candle.
+        :param low: Low of the candle, `high` if None.
+        :param opened_at: Open time of the candle in seconds since epoch. Alerts created after it stay
+            in the index, the candle may have crossed their level before they were set.
+        :return: The triggered alerts, they are removed from the index.
+        """
+        alerts = self._symbols.get(symbol)
+        if alerts is None:
+            return []
+
+        triggered = []
+        for alert_id in alerts.pop_crossed(high, high if low is None else low):
+            alert = self.alerts[alert_id]
+            if opened_at is not None and alert.get('created_at', 0) > opened_at:
+                self._index(alert)
+                continue
+            triggered.append(self.alerts.pop(alert_id))
+        return triggered
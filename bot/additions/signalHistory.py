@@ -0,0 +1,200 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+import pandas as pd
+from telegram.ext import ContextTypes
+
+logger = logging.getLogger("oracle.link")
+
+SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS signals (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    symbol TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    candle_time INTEGER NOT NULL,  -- Open time of the evaluated candle, ms since epoch (UTC)
+    evaluated_at REAL NOT NULL,
+    signal INTEGER NOT NULL,
+    stt REAL,
+    breakout_direction TEXT,
+    breakout TEXT,  -- JSON
+    trend TEXT,
+    phase TEXT,
+    trend_strength REAL,
+    price REAL,
+    partial INTEGER NOT NULL DEFAULT 0  -- Pipeline stopped by a gate, later stages weren't evaluated
+);
+-- One row per candle, every subscriber of a pair evaluates the same candle
+CREATE UNIQUE INDEX IF NOT EXISTS signals_pair_time ON signals (symbol, interval, candle_time);
+CREATE INDEX IF NOT EXISTS signals_symbol_time ON signals (symbol, candle_time);
+"""
+COLUMNS: tuple[str, ...] = ('symbol', 'interval', 'candle_time', 'evaluated_at', 'signal', 'stt',
+                            'breakout_direction', 'breakout', 'trend', 'phase', 'trend_strength', 'price', 'partial')
+# A complete evaluation of a candle replaces a partial one, whichever subscriber's job ran first
+INSERT_SQL: str = (
+    f"INSERT INTO signals ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))}) "
+    f"ON CONFLICT (symbol, interval, candle_time) DO UPDATE SET "
+    f"{', '.join(f'{column} = excluded.{column}' for column in COLUMNS[3:])} "
+    f"WHERE signals.partial = 1 AND excluded.partial = 0"
+)
+
+
+class SignalHistory:
+    """
+    Append-only log of every evaluation of a watched pair, including the ones stopped by a gate, in one SQLite file.
+
+    `record` only appends to an in-memory buffer, so it never adds I/O to the alert path; `flush`
+    writes the buffer in a single transaction and runs in a worker thread through `job`. Rows are
+    indexed by (symbol, interval, candle time) and (symbol, candle time), so queries stay in the
+    millisecond range over months of data. Bot and workers can log to the same file (WAL mode).
+    """
+
+    def __init__(self, path: str, flush_interval: float = 2.0, busy_timeout: float = 10.0,
+                 max_buffer: int = 100_000):
+        """
+        :param path: SQLite file, created with its directory if missing.
+        :param flush_interval: Seconds between writes of the buffered rows.
+        :param busy_timeout: Seconds to wait for a lock held by another process.
+        :param max_buffer: Rows kept while writes keep failing, the oldest are dropped beyond that.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._buffer: list[tuple] = []
+        self._buffer_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        # Pairs and candles already buffered, True if only as a partial evaluation
+        self._recorded: dict[tuple[str, str, int], bool] = {}
+
+        self._writer = sqlite3.connect(path, timeout=busy_timeout, isolation_level=None, check_same_thread=False)
+        self._writer.execute("PRAGMA journal_mode=WAL")
+        self._writer.execute("PRAGMA synchronous=NORMAL")
+        self._writer.executescript(SCHEMA)
+        columns = {row[1] for row in self._writer.execute("PRAGMA table_info(signals)")}
+        if 'partial' not in columns:  # File of an earlier version
+            self._writer.execute("ALTER TABLE signals ADD COLUMN partial INTEGER NOT NULL DEFAULT 0")
+        self._reader = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=False)
+        self._reader.row_factory = sqlite3.Row
+        self._reader_lock = threading.Lock()
+
+    def record(self, symbol: str, interval: str, candle_time: pd.Timestamp, signal: bool, stt: float,
+               breakout_info: Optional[dict[str, Any]], trend_info: Optional[dict[str, Any]], partial: bool = False):
+        """
+        Buffer an evaluation, repeated evaluations of the same candle are only stored once.
+
+        :param partial: The pipeline was stopped by a gate, a complete evaluation of the candle replaces it.
+        """
+        candle_ms = int(candle_time.value // 1_000_000)
+        key = (symbol, interval, candle_ms)
+        breakout_info = breakout_info or {}
+        row = (
+            symbol, interval, candle_ms, time.time(), int(signal), float(stt),
+            breakout_info.get('direction'), json.dumps(breakout_info, default=str),
+            trend_info['trend'].value if trend_info else None,
+            trend_info['phase'].value if trend_info else None,
+            float(trend_info['strength']) if trend_info else None,
+            float(trend_info['price']) if trend_info else None,
+            int(partial),
+        )
+        with self._buffer_lock:
+            if key in self._recorded and (partial or not self._recorded[key]):
+                return
+            self._recorded[key] = partial
+            self._buffer.append(row)
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def flush(self) -> int:
+        """
+        Write the buffered rows.
+
+        :return: Number of rows written.
+        """
+        with self._buffer_lock:
+            rows, self._buffer = self._buffer, []
+            self._recorded.clear()
+        if not rows:
+            return 0
+
+        with self._write_lock:
+            cursor = self._writer.cursor()
+            try:
+                cursor.execute("BEGIN IMMEDIATE")
+                cursor.executemany(INSERT_SQL, rows)
+                cursor.execute("COMMIT")
+            except Exception:
+                with self._buffer_lock:  # Retried with the next flush
+                    self._buffer[:0] = rows
+                    dropped = len(self._buffer) - self.max_buffer
+                    if dropped > 0:
+                        del self._buffer[:dropped]
+                        logger.warning(f"Signal history buffer is full, dropped the {dropped} oldest rows")
+                if self._writer.in_transaction:  # BEGIN itself fails if another process holds the lock
+                    cursor.execute("ROLLBACK")
+                raise
+            finally:
+                cursor.close()
+        return len(rows)
+
+    async def job(self, context: ContextTypes.DEFAULT_TYPE):
+        """Job queue callback flushing the buffer every `flush_interval` seconds."""
+        try:
+            await asyncio.to_thread(self.flush)
+        except sqlite3.Error as e:
+            logger.warning(f"Writing the signal history failed, retrying: {e}")
+
+    def query(self, symbol: str, interval: Optional[str] = None, since: Optional[pd.Timestamp] = None,
+              until: Optional[pd.Timestamp] = None, signals_only: bool = False,
+              limit: Optional[int] = 100) -> list[dict[str, Any]]:
+        """
+        Newest evaluations of `symbol` first. Rows still in the buffer aren't included.
+
+        :param interval: Only this interval, all intervals if None.
+        :param since: Only candles opened at or after this time (naive UTC).
+        :param until: Only candles opened before this time (naive UTC).
+        :param signals_only: Skip evaluations that didn't meet the alert condition.
+        :param limit: Maximum number of rows, None for all.
+        :return: Rows as dicts, 'candle_time' as Timestamp and 'breakout' as dict.
+        """
+        conditions, params = ["symbol = ?"], [symbol]
+        if interval is not None:
+            conditions.append("interval = ?")
+            params.append(interval)
+        if since is not None:
+            conditions.append("candle_time >= ?")
+            params.append(int(since.value // 1_000_000))
+        if until is not None:
+            conditions.append("candle_time < ?")
+            params.append(int(until.value // 1_000_000))
+        if signals_only:
+            conditions.append("signal = 1")
+
+        sql = f"SELECT * FROM signals WHERE {' AND '.join(conditions)} ORDER BY candle_time DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        with self._reader_lock:
+            rows = self._reader.execute(sql, params).fetchall()
+
+        return [
+            {**dict(row), 'signal': bool(row['signal']), 'partial': bool(row['partial']), 'candle_time': pd.Timestamp(row['candle_time'], unit='ms'),
+             'breakout': json.loads(row['breakout']) if row['breakout'] else {}}
+            for row in rows
+        ]
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+        self._reader.close()
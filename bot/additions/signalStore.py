@@ -0,0 +1,71 @@
+import logging
+from dataclasses import dataclass
+from typing import Hashable
+
+import pandas as pd
+
+from utils import parse_interval
+
+logger = logging.getLogger("oracle.link")
+
+
+@dataclass
+class _SignalState:
+    direction: Hashable
+    emitted_at: pd.Timestamp  # Candle of the last emitted signal
+    seen_at: pd.Timestamp  # Last candle the signal was checked on
+    emit: bool  # Decision for `seen_at`, repeated for every check of that candle
+
+
+class SignalStore:
+    """
+    Last emitted signal per (symbol, interval, strategy), to skip repeats of a persisting condition.
+
+    A signal is emitted if it's new, changed direction, wasn't present on the previous candle or
+    the last emission is `cooldown_candles` candles old. Decisions are per candle, so every
+    subscriber of a pair gets the same answer for the same candle.
+    """
+
+    def __init__(self, cooldown_candles: int = 3):
+        """
+        :param cooldown_candles: Candles a repeated signal of the same direction is suppressed for, 0 disables it.
+        """
+        self.cooldown_candles = cooldown_candles
+        self._states: dict[tuple[str, str, str], _SignalState] = {}
+        self.suppressed: int = 0
+
+    def should_emit(self, symbol: str, interval: str, strategy: str, direction: Hashable,
+                    candle_time: pd.Timestamp) -> bool:
+        """
+        Record a signal of `strategy` on the candle opened at `candle_time`.
+
+        :return: False if it repeats the last emitted signal within the cooldown.
+        """
+        key = (symbol, interval, strategy)
+        state = self._states.get(key)
+        if state is not None and state.seen_at == candle_time:
+            return state.emit
+
+        candle = pd.Timedelta(seconds=parse_interval(interval))
+        emit = (state is None or
+                self.cooldown_candles <= 0 or
+                direction != state.direction or
+                candle_time - state.seen_at > candle or  # The condition ended in between
+                candle_time - state.emitted_at >= candle * self.cooldown_candles)
+
+        if emit:
+            self._states[key] = _SignalState(direction, candle_time, candle_time, True)
+        else:
+            state.seen_at = candle_time
+            state.emit = False
+            self.suppressed += 1
+            logger.debug(f"Suppressed repeated {strategy} signal of {symbol} ({interval}): {direction}")
+        return emit
+
+    def forget(self, symbol: str, interval: str):
+        """Drop the states of a pair nobody watches anymore."""
+        for key in [key for key in self._states if key[:2] == (symbol, interval)]:
+            del self._states[key]
+
+    def __len__(self) -> int:
+        return len(self._states)
@@ -0,0 +1,102 @@
+import asyncio
+import json
+import urllib.request
+from typing import Any, Awaitable, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+
+class WebhookConfig:
+    def __init__(
+            self,
+            webhook_url: str,
+            listen: str = '127.0.0.1',
+            port: int = 8443,
+            url_path: str = 'telegram',
+            secret_token: Optional[str] = None,
+            max_concurrent_updates: int = 256
+    ):
+        """
+        Settings of the local webhook server. TLS is expected to be terminated upstream
+        (reverse proxy / tunnel) which forwards `webhook_url` to http://listen:port/url_path.
+
+        :param webhook_url: Public HTTPS url registered at Telegram.
+        :param listen: Address the local HTTP server binds to.
+        :param port: Port the local HTTP server binds to.
+        :param url_path: Path updates are posted to.
+        :param secret_token: Checked against the X-Telegram-Bot-Api-Secret-Token header of each request.
+        :param max_concurrent_updates: Updates processed at the same time (different users only).
+        """
+        self.webhook_url = webhook_url
+        self.listen = listen
+        self.port = port
+        self.url_path = url_path
+        self.secret_token = secret_token
+        self.max_concurrent_updates = max_concurrent_updates
+
+
+class UserSerializedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Processes updates concurrently, but never two updates of the same user at once,
+    so a user's commands still run in order and can't race on their user_data.
+    """
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        self._locks: dict[int, asyncio.Lock] = {}
+        self._waiters: dict[int, int] = {}
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        user = update.effective_user if isinstance(update, Update) else None
+        if user is None:
+            await coroutine
+            return
+
+        lock = self._locks.setdefault(user.id, asyncio.Lock())
+        self._waiters[user.id] = self._waiters.get(user.id, 0) + 1
+        try:
+            async with lock:
+                await coroutine
+        finally:
+            self._waiters[user.id] -= 1
+            if not self._waiters[user.id]:  # Nobody else queued for this user
+                del self._waiters[user.id]
+                del self._locks[user.id]
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+
+def post_update(url: str, update: dict | str, secret_token: Optional[str] = None) -> int:
+    """
+    Post a recorded Update (dict or JSON string) to a running webhook server, for local testing.
+
+    :return: HTTP status of the response.
+    """
+    body = (update if isinstance(update, str) else json.dumps(update)).encode()
+    request = urllib.request.Request(url, data=body, method='POST', headers={'Content-Type': 'application/json'})
+    if secret_token:
+        request.add_header('X-Telegram-Bot-Api-Secret-Token', secret_token)
+    with urllib.request.urlopen(request) as response:
+        return response.status
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Post recorded Telegram updates to the local webhook server")
+    parser.add_argument('url', help="e.g. http://127.0.0.1:8443/telegram")
+    parser.add_argument('files', nargs='+', help="JSON files with one Update or a list of Updates")
+    parser.add_argument('--secret-token', default=None)
+    args = parser.parse_args()
+
+    for path in args.files:
+        with open(path) as file:
+            recorded = json.load(file)
+        for recorded_update in recorded if isinstance(recorded, list) else [recorded]:
+            status = post_update(args.url, recorded_update, args.secret_token)
+            print(f"{path} update {recorded_update.get('update_id')}: HTTP {status}")
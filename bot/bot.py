@@ -1,45 +1,114 @@
+import asyncio
+import html
 import logging
 import os
-import time
 from datetime import datetime
+from typing import Optional
 
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, filters, ContextTypes, \
     CallbackQueryHandler, Application
 
-from .additions import FilteredPersistence
-from tradingComponents.patterns.breackout import breakout
-from tradingComponents.Dow import detect_dow_trend, plot_candle_chart
+from .additions import FilteredPersistence, ChartCache, WebhookConfig, UserSerializedUpdateProcessor, MemoryMonitor, \
+    PriceAlertIndex, SignalStore, SignalHistory, AlertDigest, SharedChart
+from .evaluation import evaluate_symbol, render_chart, create_gateway, warm_up
+from .scanner import MarketScanner
+from .workers import SQLiteBroker, OUTAGE_ERROR_PREFIX
+from tradingComponents.Dow import ChartRenderer
 from .commands import log_handler
-from apis.binanceApi.fetcher import fetch_klines
-from tradingComponents.strategies import ShadowsTrendingTouch
+from apis.binanceApi import fetch_prices, fetch_server_time, ExchangeClock
+from apis.circuitBreaker import CircuitOpenError, get_breaker
+from apis.marketGateway import MarketDataGateway
+from apis.multiTimeframe import MultiTimeframeEngine
 from utils import parse_interval, seconds_to_next_boundry
 
 logger = logging.getLogger("oracle.link")
 parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 
-stt = ShadowsTrendingTouch(
-    sma_period=7,
-    shadow_to_body_ratio=1.25,
-    shadow_multiplier=1,
-    opposite_shadow_to_body_ratio_limit=5.5,
-    ignore_sma_touch=True
-)
-
 class OracleLinkBot:
-    def __init__(self, token: str):
-        self.persistence = FilteredPersistence(blacklist_keys=['running'] ,filepath=f'{parent_dir}/data/userData/oracle_link_bot.pkl')
-        self.app: Application = (ApplicationBuilder().
-                                 token(token).
-                                 persistence(self.persistence).
-                                 post_init(self.post_init).
-                                 post_stop(self.post_stop).
-                                 build())
+    def __init__(self, token: str, chart_renderer: Optional[ChartRenderer] = None, text_first_alerts: bool = False,
+                 broker: Optional[SQLiteBroker] = None, webhook: Optional[WebhookConfig] = None,
+                 base_url: Optional[str] = None, persistence_path: Optional[str] = None,
+                 memory_monitor: Optional[MemoryMonitor] = None, admin_ids: Optional[set[int]] = None,
+                 alert_poll_interval: float = 5, clock_sync_interval: float = 600,
+                 alltick_token: Optional[str] = None, signal_cooldown: int = 3, warm_up_window: float = 300,
+                 history: Optional[SignalHistory] = None, digest_alerts: bool = False):
+        """
+        :param token: Telegram bot token.
+        :param chart_renderer: Renderer reusing chart templates between alerts. Falls back to
+            `plot_candle_chart` (mplfinance) if None.
+        :param text_first_alerts: If True, alerts are sent as text with a "📈 Chart" button and
+            the chart is only rendered when the button is tapped.
+        :param broker: Enables worker mode: subscriptions are written to the broker and evaluated by
+            `EvaluationWorker` processes, this process only handles commands and delivers their results.
+        :param webhook: Receive updates through a local webhook server instead of polling. Updates of
+            different users are then processed concurrently.
+        :param base_url: Bot API base url, e.g. of a local fake server for load tests.
+        :param persistence_path: Pickle file of the user data, defaults to data/userData/oracle_link_bot.pkl.
+        :param memory_monitor: Enables tracemalloc snapshots and periodic memory reports.
+        :param admin_ids: Telegram user ids allowed to use admin commands like /memory.
+        :param alert_poll_interval: Seconds between the price checks of /alert price levels.
+        :param clock_sync_interval: Seconds between syncs of the local clock offset with Binance.
+        :param alltick_token: Alltick API token, enables 'alltick:EURUSD' style watchlist entries.
+        :param signal_cooldown: Candles a repeated signal of the same direction isn't sent again for, 0 sends every one.
+        :param warm_up_window: Longest span in seconds the history fetches of resumed subscriptions are spread over
+            after a restart. Each is done before its interval's next boundary.
+        :param history: Log of the evaluated signals, enables /history.
+        :param digest_alerts: Default of /digest: send the charts a user gets at one boundary as albums
+            instead of one message each. Not used for text-first alerts.
+        """
+        self.chart_renderer: Optional[ChartRenderer] = chart_renderer
+        self.text_first_alerts: bool = text_first_alerts
+        self.broker: Optional[SQLiteBroker] = broker
+        self.chart_cache: ChartCache = ChartCache()
+        # One base stream per symbol, higher intervals are aggregated locally
+        self.gateway: MarketDataGateway = create_gateway(alltick_token)  # Routes 'exchange:SYMBOL' entries to their source
+        self.market_data: MultiTimeframeEngine = MultiTimeframeEngine(fetch=self.gateway.fetch_klines)
+        self.signal_store: SignalStore = SignalStore(cooldown_candles=signal_cooldown)
+        self.warm_up_window: float = warm_up_window
+        self.history: Optional[SignalHistory] = history
+        self.digest_alerts: bool = digest_alerts
+        # Worker results of one boundary arrive over several `deliver_results` ticks, wait longer for them
+        self.alert_digest: AlertDigest = AlertDigest(grace=0.5 if broker is None else 2)
+        self.webhook: Optional[WebhookConfig] = webhook
+        self.memory_monitor: Optional[MemoryMonitor] = memory_monitor
+        self.admin_ids: set[int] = admin_ids or set()
+        self.alert_poll_interval: float = alert_poll_interval
+        self.clock_sync_interval: float = clock_sync_interval
+        self.exchange_clock: ExchangeClock = ExchangeClock(fetch_server_time)
+        self.price_alerts: Optional[PriceAlertIndex] = None  # Loaded from bot_data in post_init
+        self.scanner: MarketScanner = MarketScanner()
+        self._candle_alerts: list[tuple[dict, float]] = []  # Triggered by closed candles, sent with the next price check
+        self._outage_chats: dict[str, set[int]] = {}  # Chats told about an outage, by data source
+        self.persistence = FilteredPersistence(
+            blacklist_keys=['running'],
+            filepath=persistence_path or f'{parent_dir}/data/userData/oracle_link_bot.pkl'
+        )
+        builder: ApplicationBuilder = (ApplicationBuilder().
+                                       token(token).
+                                       persistence(self.persistence).
+                                       post_init(self.post_init).
+                                       post_stop(self.post_stop))
+        if base_url is not None:
+            builder.base_url(base_url).base_file_url(base_url.replace('/bot', '/file/bot'))
+        if webhook is not None:
+            builder.concurrent_updates(UserSerializedUpdateProcessor(webhook.max_concurrent_updates))
+        self.app: Application = builder.build()
         self.startup_time = datetime.now()
 
     def run(self):
         print("🚀 Bot is running...")
-        self.app.run_polling()
+        if self.webhook is None:
+            self.app.run_polling()
+            return
+
+        self.app.run_webhook(
+            listen=self.webhook.listen,
+            port=self.webhook.port,
+            url_path=self.webhook.url_path,
+            webhook_url=self.webhook.webhook_url,
+            secret_token=self.webhook.secret_token,
+        )
 
     async def post_init(self, application: Application):
         application.add_handler(CommandHandler("start", self.start_command))
@@ -50,27 +119,249 @@ class OracleLinkBot:
         application.add_handler(CommandHandler("rmv", self.remove_symbol_command))
         application.add_handler(CommandHandler("list", self.list_watchlist_command))
         application.add_handler(CommandHandler("mydata", self.my_data_command)) # For debugging
+        application.add_handler(CommandHandler("memory", self.memory_command))
+        application.add_handler(CommandHandler("alert", self.alert_command))
+        application.add_handler(CommandHandler("history", self.history_command))
+        application.add_handler(CommandHandler("digest", self.digest_command))
+        # Takes a few seconds, don't hold back other updates meanwhile
+        application.add_handler(CommandHandler("scan", self.scan_command, block=False))
 
         application.add_handler(CallbackQueryHandler(self.inline_button_handler))
         # Doesn't work if the command exists
         application.add_handler(MessageHandler(filters.COMMAND, log_handler, block=False))
 
+        if self.broker is not None:
+            application.job_queue.run_repeating(self.deliver_results, interval=1, first=1)
+
+        # Boundaries and closed candles follow the exchange clock, sync before any job is scheduled
+        await asyncio.to_thread(self.exchange_clock.sync)
+        application.job_queue.run_repeating(self.sync_clock, interval=self.clock_sync_interval,
+                                            first=self.clock_sync_interval)
+
+        # Alerts are stored in bot_data, so they are persisted with it
+        self.price_alerts = PriceAlertIndex(application.bot_data.setdefault('price_alerts', {}))
+        self.market_data.add_listener(self.check_candle_alerts)
+        application.job_queue.run_repeating(self.check_price_alerts, interval=self.alert_poll_interval,
+                                            first=self.alert_poll_interval)
+
+        if self.history is not None:
+            application.job_queue.run_repeating(self.history.job, interval=self.history.flush_interval,
+                                                first=self.history.flush_interval)
+
+        if self.memory_monitor is not None:
+            self.memory_monitor.start()
+            application.job_queue.run_repeating(self.memory_monitor.job, interval=self.memory_monitor.interval,
+                                                first=self.memory_monitor.interval)
+
+        resumed: set[int] = self.resume_subscriptions(application)
+
         all_user_data: dict = await self.persistence.get_user_data()
         logger.info(f"Notifying {len(all_user_data)} users...")
         for user_id in all_user_data.keys():
             await application.bot.send_message(
                 chat_id=user_id,
-                text="🚀 Oracle Link Bot booted... ヾ(≧▽≦*)o"
+                text="🚀 Oracle Link Bot booted... ヾ(≧▽≦*)o" +
+                     ("\n▶️ Your watchlist was resumed, no need to /start again." if user_id in resumed else "")
             )
 
+    def resume_subscriptions(self, application: Application) -> set[int]:
+        """
+        Reschedule the jobs of every user that was running before the restart.
+
+        The candle history of each (symbol, interval) is fetched ahead of its first boundary, spread over
+        the time until then, so the restart doesn't cause a burst of requests at startup or at the boundary.
+
+        :return: Ids of the resumed users.
+        """
+        # Started watchlists are stored in bot_data, `running` itself isn't persisted
+        subscriptions: dict[int, dict] = application.bot_data.setdefault('subscriptions', {})
+        pairs: set[tuple[str, str]] = set()
+        for user_id, subscription in subscriptions.items():
+            application.user_data[user_id]['running'] = True
+            if self.broker is None:  # Otherwise the subscriptions are still in the broker
+                self.schedule_watchlist(application.job_queue, user_id, subscription['chat_id'],
+                                        subscription['watchlist'])
+                pairs.update((symbol, interval) for symbol, interval, _ in subscription['watchlist'])
+
+        for index, (symbol, interval) in enumerate(sorted(pairs)):
+            window = min(seconds_to_next_boundry(parse_interval(interval)) * 0.8, self.warm_up_window)
+            application.job_queue.run_once(self.warm_up_job, when=window * index / len(pairs),
+                                           data={'symbol': symbol, 'interval': interval, 'warm_up': True})
+
+        if subscriptions:
+            logger.info(f"Resumed {len(subscriptions)} users, warming up {len(pairs)} (symbol, interval) pairs")
+        return set(subscriptions)
+
+    async def warm_up_job(self, context: ContextTypes.DEFAULT_TYPE):
+        symbol, interval = context.job.data['symbol'], context.job.data['interval']
+        try:
+            await warm_up(self.market_data, symbol, interval)
+        except Exception as e:  # Fetched at the boundary instead
+            logger.warning(f"Warm-up of {symbol} ({interval}) failed: {e}")
+
+    async def sync_clock(self, context: ContextTypes.DEFAULT_TYPE):
+        await asyncio.to_thread(self.exchange_clock.sync)
+
     async def my_data_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE): # For debugging
         await update.message.reply_text("My data: {}".format(context.user_data))
 
+    async def scan_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        valid_timeframes = ['1m', '5m', '15m', '30m', '1h', '4h', '1d', '1w']
+        if len(context.args) != 1 or context.args[0].lower() not in valid_timeframes:
+            await update.message.reply_text(f"Usage: /scan <timeframe>\nValid options: {', '.join(valid_timeframes)}")
+            return
+
+        interval = context.args[0].lower()
+        message = await update.message.reply_text(f"🔎 Scanning all USDT pairs on {interval}...")
+        try:
+            scan = await self.scanner.scan(interval)
+        except Exception as e:
+            await message.edit_text(f"Error: {e}")
+            raise
+        await message.edit_text(self.scanner.format_summary(scan), parse_mode="HTML")
+
+    async def alert_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        args = context.args
+        user_id = update.effective_user.id
+
+        if not args:
+            alerts = sorted(self.price_alerts.user_alerts(user_id), key=lambda alert: (alert['symbol'], alert['price']))
+            if not alerts:
+                await update.message.reply_text("No price alerts. Usage: /alert <symbol> <above|below> <price>")
+                return
+            message = "<b>🔔 Price alerts</b>\n\n<code>"
+            for alert in alerts:
+                message += f"#{alert['id']:<6} {alert['symbol']:<9} {alert['direction']:<5} {alert['price']:g}\n"
+            message += "</code>\nRemove one with /alert rm <id>"
+            await update.message.reply_text(message, parse_mode="HTML")
+            return
+
+        if args[0].lower() == 'rm' and len(args) == 2:
+            alert = self.price_alerts.remove(int(args[1].lstrip('#')), user_id) if args[1].lstrip('#').isdigit() else None
+            if alert is None:
+                await update.message.reply_text(f"⚠️ No alert {args[1]} found")
+                return
+            await update.message.reply_text(f"✅ Removed alert #{alert['id']} ({alert['symbol']} {alert['direction']} "
+                                            f"{alert['price']:g})")
+            return
+
+        if len(args) != 3:
+            await update.message.reply_text("Usage: /alert <symbol> <above|below> <price>\n"
+                                            "/alert to list, /alert rm <id> to remove")
+            return
+
+        symbol, direction = args[0].upper(), args[1].lower()
+        try:
+            price = float(args[2])
+            alert = self.price_alerts.add(user_id, update.effective_chat.id, symbol, direction, price)
+        except ValueError as e:
+            await update.message.reply_text(f"⚠️ {e}")
+            return
+
+        await update.message.reply_text(f"✅ Alert #{alert['id']}: {symbol} {direction} {price:g}")
+
+    def check_candle_alerts(self, symbol: str, interval: str, candles):
+        """MultiTimeframeEngine listener, catches levels crossed between two price checks."""
+        for alert in self.price_alerts.check(symbol, candles['High'].max(), candles['Low'].min(),
+                                             opened_at=candles.index[0].timestamp()):
+            self._candle_alerts.append((alert, candles['Close'].iloc[-1]))
+
+    async def check_price_alerts(self, context: ContextTypes.DEFAULT_TYPE):
+        # Candle alerts are already out of the index, they are sent even if the price check fails
+        triggered, self._candle_alerts = self._candle_alerts, []
+        if self.price_alerts:
+            try:
+                prices: dict[str, float] = await asyncio.to_thread(fetch_prices)  # One request for all symbols
+            except CircuitOpenError as e:
+                logger.debug(f"Skipping price alert check: {e}")
+                prices = {}
+            except Exception as e:
+                logger.warning(f"Price alert check failed: {e}")
+                prices = {}
+            for symbol in self.price_alerts.symbols:
+                if symbol in prices:
+                    triggered.extend((alert, prices[symbol]) for alert in self.price_alerts.check(symbol, prices[symbol]))
+
+        for alert, price in triggered:
+            arrow = "📈" if alert['direction'] == 'above' else "📉"
+            try:
+                await context.bot.send_message(
+                    chat_id=alert['chat_id'],
+                    text=f"🔔 Alert #{alert['id']}\n{arrow} {alert['symbol']} is {alert['direction']} "
+                         f"{alert['price']:g} (price: {price:g})"
+                )
+            except Exception as e:
+                logger.warning(f"Failed to send price alert #{alert['id']} to {alert['chat_id']}: {e}")
+
+    async def history_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """/history <symbol> [interval]: the last evaluated signals of a symbol."""
+        args = context.args
+        if len(args) not in [1, 2]:
+            await update.message.reply_text("Usage: /history <symbol> [interval]")
+            return
+        if self.history is None:
+            await update.message.reply_text("Signal history is disabled.")
+            return
+
+        symbol = args[0].upper()
+        interval = args[1].lower() if len(args) == 2 else None
+        rows = await asyncio.to_thread(self.history.query, symbol, interval, limit=15)
+        if not rows:
+            await update.message.reply_text(f"No signals recorded for {symbol}{f' ({interval})' if interval else ''} yet.")
+            return
+
+        table = f"{'UTC':<11} {'TF':<4}    STT {'Breakout':<8} Dow\n"
+        for row in rows:
+            trend = f"{row['trend']} - {row['phase']}" if row['trend'] else "-"
+            table += (f"{row['candle_time']:%m-%d %H:%M} {row['interval']:<4} {'✅' if row['signal'] else '➖'} "
+                      f"{row['stt']:>5.2f} {row['breakout_direction'] or '-':<8} {trend}\n")
+        await update.message.reply_text(f"<b>📜 {html.escape(symbol)}</b>\n<pre>{html.escape(table)}</pre>",
+                                        parse_mode="HTML")
+
+    def uses_digest(self, user_id: int) -> bool:
+        return not self.text_first_alerts and self.app.user_data.get(user_id, {}).get('digest', self.digest_alerts)
+
+    async def digest_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """/digest [on|off]: bundle the charts of a boundary into albums."""
+        args = context.args
+        if not args:
+            state = "on" if self.uses_digest(update.effective_user.id) else "off"
+            await update.message.reply_text(f"📦 Digest mode is {state}. Usage: /digest <on|off>")
+            return
+        if args[0].lower() not in ('on', 'off'):
+            await update.message.reply_text("Usage: /digest <on|off>")
+            return
+
+        context.user_data['digest'] = args[0].lower() == 'on'
+        if context.user_data['digest']:
+            message = "📦 Charts of the same boundary are now sent together as albums."
+            if self.text_first_alerts:
+                message += "\nℹ️ Alerts are sent as text first, so they aren't bundled."
+        else:
+            message = "📨 Every chart is now sent as its own message."
+        await update.message.reply_text(message)
+
+    async def memory_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        if update.effective_user.id not in self.admin_ids:
+            await update.message.reply_text("⛔ This command is only available to admins.")
+            return
+        if self.memory_monitor is None:
+            await update.message.reply_text("Memory monitoring is disabled. Set MEMORY_MONITOR_INTERVAL to enable it.")
+            return
+
+        # Off the event loop, and without moving the reference of the periodic reports
+        report = await asyncio.to_thread(self.memory_monitor.snapshot, update_previous=False)
+        report = MemoryMonitor.format_report(report)[:4000]  # Telegram message limit
+        await update.message.reply_text(f"<pre>{html.escape(report)}</pre>", parse_mode="HTML")
+
     async def status_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         user_data = context.user_data
         running = user_data.get('running', False)
 
-        total_job_count = len(context.job_queue.jobs())
+        if self.broker is not None:
+            total_job_count = self.broker.subscription_count()
+        else:
+            total_job_count = len(context.job_queue.jobs())
         user_running_job_count = len(user_data.get('watchlist', []))
 
         # Calculate the time difference
@@ -87,7 +378,9 @@ class OracleLinkBot:
     async def add_symbol_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         args = context.args
         if len(args) not in [2, 3]:
-            await update.message.reply_text("Usage: /add <symbol> <timeframe> <send_always: optional>")
+            await update.message.reply_text("Usage: /add <symbol> <timeframe> <send_always: optional>\n"
+                                            "Other exchanges: /add kraken:BTC/USD 1h, Yahoo Finance: /add yahoo:AAPL 1h, "
+                                            "Forex: /add alltick:EURUSD 1h")
             return
 
         symbol = args[0].upper()
@@ -101,6 +394,12 @@ class OracleLinkBot:
                 f"Invalid timeframe. Valid options: {', '.join(valid_timeframes)}"
             )
             return
+        try:
+            self.gateway.validate(symbol)
+        except ValueError as e:
+            await update.message.reply_text(f"⚠️ {e}")
+            return
+
         watchlist = context.user_data.setdefault('watchlist', [])
         if (symbol, timeframe, send_always) in watchlist:
             await update.message.reply_text(
@@ -172,24 +471,15 @@ class OracleLinkBot:
 
         chat_id = update.effective_chat.id
         user_data['running'] = True
+        context.bot_data.setdefault('subscriptions', {})[update.effective_user.id] = {
+            'chat_id': chat_id,
+            'watchlist': list(watchlist),
+        }
 
-        for symbol, interval_str, send_always in watchlist:
-            interval_sec: int = parse_interval(interval_str)
-            delay: float = seconds_to_next_boundry(interval_sec)
-
-            logger.debug(f"Starting job for {symbol} with interval {interval_sec} seconds; Send always: {send_always}")
-            context.job_queue.run_repeating(
-                self.scheduled_job,
-                interval=interval_sec,
-                first=delay,
-                data={
-                    'chat_id': chat_id,
-                    'user_id': update.effective_user.id,
-                    'symbol': symbol,
-                    'interval': interval_str,
-                    'send_always': send_always
-                }
-            )
+        if self.broker is not None:
+            self.broker.subscribe(update.effective_user.id, chat_id, watchlist)
+        else:
+            self.schedule_watchlist(context.job_queue, update.effective_user.id, chat_id, watchlist)
 
         await update.message.reply_text(
             "✅ Started watching your symbols! (▀̿Ĺ̯▀̿ ̿)\n"
@@ -209,17 +499,44 @@ class OracleLinkBot:
             return
 
         user_data['running'] = False
+        context.bot_data.get('subscriptions', {}).pop(update.effective_user.id, None)
+
+        if self.broker is not None:
+            self.broker.unsubscribe(update.effective_user.id)
 
         # Stop all jobs
         for job in context.job_queue.jobs():
-            if job.data['user_id'] == update.effective_user.id:
+            if job.data and job.data.get('user_id') == update.effective_user.id:
                 job.schedule_removal()
+                self.market_data.unregister(job.data['symbol'], job.data['interval'])
+                if not self.market_data.is_registered(job.data['symbol'], job.data['interval']):
+                    self.signal_store.forget(job.data['symbol'], job.data['interval'])
 
         await update.message.reply_text(
             "🛑 Stopped watching your symbols. (_　_)。゜zｚＺ\n"
             "ℹ️ To start again, simply use /start."
         )
 
+    def schedule_watchlist(self, job_queue, user_id: int, chat_id: int, watchlist: list[tuple[str, str, bool]]):
+        for symbol, interval_str, send_always in watchlist:
+            interval_sec: int = parse_interval(interval_str)
+            delay: float = seconds_to_next_boundry(interval_sec)
+
+            logger.debug(f"Starting job for {symbol} with interval {interval_sec} seconds; Send always: {send_always}")
+            self.market_data.register(symbol, interval_str)
+            job_queue.run_repeating(
+                self.scheduled_job,
+                interval=interval_sec,
+                first=delay,
+                data={
+                    'chat_id': chat_id,
+                    'user_id': user_id,
+                    'symbol': symbol,
+                    'interval': interval_str,
+                    'send_always': send_always
+                }
+            )
+
     def create_watchlist_keyboard(self, watchlist, page=0, items_per_page=5):
         start_idx = page * items_per_page
         end_idx = start_idx + items_per_page
@@ -286,6 +603,9 @@ class OracleLinkBot:
                 
                 await query.answer(f"Removed {symbol} ({interval}){' Send always: on' if send_always else ' Send always: off'} ✅")
 
+        elif query.data.startswith('chart_'):
+            await self.send_cached_chart(query, context)
+
         elif query.data == 'start':
             if context.user_data.get('running'):
                 await query.answer("Bot is already running! 🤖")
@@ -303,6 +623,28 @@ class OracleLinkBot:
         context.user_data['watchlist'] = []
         await update.message.reply_text("Watchlist cleared. ╰(￣ω￣ｏ)")
 
+    def render_chart(self, **render_kwargs):
+        return render_chart(self.chart_renderer, **render_kwargs)
+
+    async def send_cached_chart(self, query, context: ContextTypes.DEFAULT_TYPE):
+        """Render (or reuse) the chart behind a "📈 Chart" button of a text-first alert."""
+        chart_id: str = query.data.split('_', 1)[1]
+        entry = self.chart_cache.get(chart_id)
+        if entry is None:
+            await query.answer("Chart expired, wait for the next alert. ⌛")
+            return
+
+        await query.answer()
+        if entry['file_id'] is not None:
+            await context.bot.send_photo(chat_id=query.message.chat_id, photo=entry['file_id'],
+                                         reply_to_message_id=query.message.message_id)
+            return
+
+        photo = entry['photo'] if entry['photo'] is not None else self.render_chart(**entry['render_kwargs'])
+        message = await context.bot.send_photo(chat_id=query.message.chat_id, photo=photo,
+                                               reply_to_message_id=query.message.message_id)
+        self.chart_cache.set_file_id(chart_id, message.photo[-1].file_id)
+
     async def scheduled_job(self, context: ContextTypes.DEFAULT_TYPE):
         job_data = context.job.data
         chat_id = job_data["chat_id"]
@@ -310,39 +652,116 @@ class OracleLinkBot:
         symbol = job_data["symbol"]
         send_always = job_data["send_always"]
 
-        # Fetching data
-        # Due to random delays we delay for new candle and remove it
-        try:
-            time.sleep(2)
-            df = fetch_klines(symbol=symbol, interval=interval, limit=75)
-            df = df.iloc[:-1]
+        # Alerts of a digest user are collected until all of its jobs for this boundary are done
+        digest_batch = self.alert_digest.begin(context.bot, chat_id) if self.uses_digest(job_data["user_id"]) else None
+        alert = None
 
-            # STT
-            conf = stt.evaluate(df)
-
-            # Breakout
-            breakout_info: dict[str, float | str] = breakout(df)
-
-            if not send_always and (conf == 0 or breakout_info["direction"] is None):
+        # Jobs fire at the exchange boundary, the engine only returns candles the exchange closed
+        try:
+            evaluation = await evaluate_symbol(self.market_data, symbol, interval, send_always, self.signal_store,
+                                               self.history)
+            if self._outage_chats:
+                await self.notify_recovery(context.bot)
+            if evaluation is None:
                 return
 
-            # Dow
-            result, peaks, valleys = detect_dow_trend(df)
-            buf = plot_candle_chart(df, peaks, valleys, result, breakout_info=breakout_info, sma=stt.sma_period, symbol=symbol,
-                                    return_img_buffer=True, show_candles=25)
+            caption: str = evaluation['caption']
+            render_kwargs = evaluation['render_kwargs']
 
-            caption: str = f"{symbol}-{interval}\n\n"
-            caption += f"STT: {conf}\n"
-
-            caption += "\nBreakout:\n"
-            for key, value in breakout_info.items():
-                caption += f"{key}: {value}\n"
+            if self.text_first_alerts:
+                chart_id: str = self.chart_cache.put(render_kwargs)
+                keyboard = InlineKeyboardMarkup([
+                    [InlineKeyboardButton("📈 Chart", callback_data=f"chart_{chart_id}")]
+                ])
+                await context.bot.send_message(chat_id=chat_id, text=caption, reply_markup=keyboard)
+                return
 
+            buf = self.render_chart(**render_kwargs)
+            if digest_batch is not None:
+                alert = (f"{symbol}-{interval}", caption, buf)
+                return
             await context.bot.send_photo(chat_id=chat_id, photo=buf, caption=caption)
 
+        except CircuitOpenError as e:
+            await self.notify_outage(context.bot, chat_id, e.source)
         except Exception as e:
             await context.bot.send_message(chat_id=chat_id, text=f"Error: {e}")
             raise
+        finally:
+            if digest_batch is not None:
+                await self.alert_digest.finish(context.bot, chat_id, digest_batch, alert)
+
+    async def notify_outage(self, bot, chat_id: int, source: str):
+        """Tell a chat once per outage that alerts of `source` are paused, instead of an error per job."""
+        chats = self._outage_chats.setdefault(source, set())
+        if chat_id in chats:
+            return
+        chats.add(chat_id)
+        try:
+            await bot.send_message(
+                chat_id=chat_id,
+                text=f"⚠️ {source} is unreachable right now. Your alerts are paused until it recovers, "
+                     f"you'll get a message once it's back. (╥﹏╥)"
+            )
+        except Exception as e:
+            logger.warning(f"Failed to send outage notice to {chat_id}: {e}")
+
+    async def notify_recovery(self, bot, sources: Optional[list[str]] = None):
+        """
+        Tell the chats notified by `notify_outage` that their alerts are back.
+
+        :param sources: Recovered data sources, by default all whose circuit is closed again.
+        """
+        if sources is None:
+            sources = [source for source in self._outage_chats if not get_breaker(source).is_open]
+        for source in sources:
+            for chat_id in self._outage_chats.pop(source, set()):
+                try:
+                    await bot.send_message(chat_id=chat_id, text=f"✅ {source} is back, alerts resumed. ヾ(≧▽≦*)o")
+                except Exception as e:
+                    logger.warning(f"Failed to send recovery notice to {chat_id}: {e}")
+
+    async def deliver_results(self, context: ContextTypes.DEFAULT_TYPE):
+        """Worker mode: send the results pushed by the evaluation workers to their subscribers."""
+        chart_ids: dict[int, str] = {}  # Text-first alerts of a result share one cached chart
+        for result in self.broker.pop_results():
+            subscribers = self.broker.subscribers(result['symbol'], result['interval'])
+            error: Optional[str] = result['error']
+            if error is not None and error.startswith(OUTAGE_ERROR_PREFIX):
+                for chat_id, _, _ in subscribers:
+                    await self.notify_outage(context.bot, chat_id, error[len(OUTAGE_ERROR_PREFIX):])
+                continue
+            if self._outage_chats:  # The workers reach their data sources again
+                await self.notify_recovery(context.bot, list(self._outage_chats))
+
+            if error is not None:
+                logger.warning(f"Worker failed to evaluate {result['symbol']} ({result['interval']}): {error}")
+                continue
+
+            chart = SharedChart(result['photo'])  # Uploaded once, the other subscribers and digests reuse its file id
+            for chat_id, user_id, send_always in subscribers:
+                try:
+                    if not (result['signal'] or send_always):
+                        continue
+                    elif self.text_first_alerts:
+                        if result['id'] not in chart_ids:
+                            chart_ids[result['id']] = self.chart_cache.put(photo=result['photo'])
+                        keyboard = InlineKeyboardMarkup([
+                            [InlineKeyboardButton("📈 Chart", callback_data=f"chart_{chart_ids[result['id']]}")]
+                        ])
+                        await context.bot.send_message(chat_id=chat_id, text=result['caption'], reply_markup=keyboard)
+                    elif self.uses_digest(user_id):
+                        # Joins the chat's open batch, so results of later ticks are bundled as well
+                        batch = self.alert_digest.begin(context.bot, chat_id)
+                        await self.alert_digest.finish(context.bot, chat_id, batch, (
+                            f"{result['symbol']}-{result['interval']}", result['caption'], chart
+                        ))
+                    else:
+                        message = await context.bot.send_photo(chat_id=chat_id, photo=chart.photo,
+                                                               caption=result['caption'])
+                        chart.sent(message)
+                except Exception as e:
+                    logger.warning(f"Failed to deliver {result['symbol']} ({result['interval']}) to {chat_id}: {e}")
 
     async def post_stop(self, application: Application):
         logger.info("Shutting down...")
@@ -358,4 +777,7 @@ class OracleLinkBot:
                 logger.warning(f"Failed to send shutdown notification to user {user_id}: {e}")
 
         await application.persistence.flush()
+        await self.gateway.close()
+        if self.history is not None:
+            await asyncio.to_thread(self.history.close)
         logger.info("Successfully shut down.")
\ No newline at end of file
@@ -0,0 +1,137 @@
+import asyncio
+from io import BytesIO
+from typing import Any, Optional
+
+from apis.alltickerApi import AlltickSource
+from apis.binanceApi.fetcher import fetch_klines
+from apis.marketGateway import MarketDataGateway
+from apis.multiTimeframe import MultiTimeframeEngine
+from apis.yahooAPI import fetch_klines_async as fetch_yahoo_klines_async
+from bot.additions import SignalStore, SignalHistory
+from tradingComponents.Dow import detect_dow_trend, plot_candle_chart, ChartRenderer, DOW_LOOKBACK, DOW_COST
+from tradingComponents.patterns import breakout, BREAKOUT_LOOKBACK, BREAKOUT_COST
+from tradingComponents.pipeline import SignalPipeline, PipelineStage
+from tradingComponents.strategies import ShadowsTrendingTouch
+from utils import parse_interval, seconds_to_next_boundry
+
+SHOW_CANDLES: int = 25
+SIGNAL_STRATEGY: str = 'stt_breakout'  # Key of the pipeline's alert condition in the `SignalStore`
+EARLY_FIRE_TOLERANCE: float = 1.0  # Seconds before a boundary a job may fire, e.g. after clock drift
+
+stt = ShadowsTrendingTouch(
+    sma_period=7,
+    shadow_to_body_ratio=1.25,
+    shadow_multiplier=1,
+    opposite_shadow_to_body_ratio_limit=5.5,
+    ignore_sma_touch=True
+)
+
+# Cheapest gates first, Dow only runs (and widens the fetched window) once an alert is certain
+pipeline = SignalPipeline([
+    PipelineStage.from_strategy('stt', stt, gate=lambda conf: conf != 0),
+    PipelineStage('breakout', breakout, lookback=BREAKOUT_LOOKBACK, cost=BREAKOUT_COST,
+                  gate=lambda breakout_info: breakout_info['direction'] is not None),
+    PipelineStage('dow', detect_dow_trend, lookback=DOW_LOOKBACK, cost=DOW_COST),
+])
+
+
+async def fetch_klines_async(symbol: str, interval: str, limit: int):
+    return await asyncio.to_thread(fetch_klines, symbol=symbol, interval=interval, limit=limit)
+
+
+def create_gateway(alltick_token: Optional[str] = None) -> MarketDataGateway:
+    """
+    Binance for plain symbols, 'yahoo:AAPL' for Yahoo Finance, 'alltick:EURUSD' for Alltick
+    (if a token is given) and 'kraken:BTC/USD' for any ccxt exchange.
+    """
+    sources = {'alltick': AlltickSource(alltick_token)} if alltick_token else None
+    return MarketDataGateway(default_fetch=fetch_klines_async, fetchers={'yahoo': fetch_yahoo_klines_async},
+                             sources=sources)
+
+
+def signal_direction(results: dict[str, Any]) -> str:
+    """Direction of an alert condition, a change is always sent even during the cooldown."""
+    return f"{'buy' if results['stt'] > 0 else 'sell'} {results['breakout']['direction']}"
+
+
+async def wait_for_boundary(interval: str):
+    """Wait for the exchange boundary if called just before it, so the candle ending there is evaluated."""
+    remaining: float = seconds_to_next_boundry(parse_interval(interval))
+    if remaining < EARLY_FIRE_TOLERANCE:
+        await asyncio.sleep(remaining)
+
+
+def build_caption(symbol: str, interval: str, conf: float, breakout_info: dict[str, float | str],
+                  trend_info: Optional[dict]) -> str:
+    caption: str = f"{symbol}-{interval}\n\n"
+    caption += f"STT: {conf}\n"
+
+    caption += "\nBreakout:\n"
+    for key, value in breakout_info.items():
+        caption += f"{key}: {value}\n"
+
+    if trend_info:
+        caption += f"\nDow: {trend_info['trend'].value} - {trend_info['phase'].value}\n"
+    else:
+        caption += "\nDow: No clear trend\n"
+
+    return caption
+
+
+def render_chart(chart_renderer: Optional[ChartRenderer], **render_kwargs) -> BytesIO:
+    if chart_renderer is not None:
+        return chart_renderer.render(**render_kwargs)
+    return plot_candle_chart(**render_kwargs, return_img_buffer=True)
+
+
+async def warm_up(market_data: MultiTimeframeEngine, symbol: str, interval: str):
+    """Fetch the history the pipeline needs ahead of time, so the next boundary only fetches the new candles."""
+    await market_data.get_klines(symbol, interval, pipeline.lookback)
+
+
+async def evaluate_symbol(market_data: MultiTimeframeEngine, symbol: str, interval: str,
+                          send_always: bool, signal_store: Optional[SignalStore] = None,
+                          history: Optional[SignalHistory] = None) -> Optional[dict[str, Any]]:
+    """
+    Run the signal pipeline for one (symbol, interval).
+
+    :param signal_store: Suppresses repeats of a persisting signal, checked before the Dow stage and
+        the chart. With `send_always` a repeated signal is still evaluated but has 'signal' False.
+    :param history: Log of every evaluation, including the ones stopped by a gate, only buffered here.
+    :return: None if no alert should be sent, otherwise a dict with 'signal' (alert condition met),
+        'caption', 'render_kwargs' for `render_chart` and the raw pipeline 'results'.
+    """
+    async def fetch(limit: int):
+        return await market_data.get_klines(symbol, interval, limit)
+
+    def confirm(df, results: dict[str, Any]) -> bool:
+        return signal_store is None or signal_store.should_emit(symbol, interval, SIGNAL_STRATEGY,
+                                                                signal_direction(results), df.index[-1])
+
+    await wait_for_boundary(interval)
+    evaluation = await pipeline.run(fetch, send_always=send_always, confirm=confirm, partial=history is not None)
+    if evaluation is None:
+        return None
+
+    df, results = evaluation
+    if not pipeline.completed(results):  # Stopped by a gate or a suppressed repeat
+        history.record(symbol, interval, df.index[-1], False, results['stt'], results.get('breakout'), None,
+                       partial=True)
+        return None
+
+    signal: bool = pipeline.passed(results) and (not send_always or confirm(df, results))
+    df = df.iloc[-DOW_LOOKBACK:]  # Same candles the peaks and valleys refer to
+    conf = results['stt']
+    breakout_info: dict[str, float | str] = results['breakout']
+    trend_info, peaks, valleys = results['dow']
+    if history is not None:
+        history.record(symbol, interval, df.index[-1], signal, conf, breakout_info, trend_info)
+
+    return {
+        'signal': signal,
+        'caption': build_caption(symbol, interval, conf, breakout_info, trend_info),
+        'render_kwargs': dict(df=df, peaks=peaks, valleys=valleys, trend_info=trend_info,
+                              breakout_info=breakout_info, sma=stt.sma_period, symbol=symbol,
+                              show_candles=SHOW_CANDLES),
+        'results': results,
+    }
@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Optional
+
+import pandas as pd
+
+from apis.binanceApi import fetch_klines, fetch_usdt_symbols
+from apis.circuitBreaker import get_breaker
+from tradingComponents.patterns import breakout, BREAKOUT_LOOKBACK
+from utils import parse_interval, utc_timestamp
+from .evaluation import stt
+
+logger = logging.getLogger("oracle.link")
+
+SCAN_LOOKBACK: int = max(stt.lookback, BREAKOUT_LOOKBACK)
+SYMBOLS_TTL: float = 3600  # exchangeInfo barely changes, refresh the pair list hourly
+# Failed scan requests open this breaker instead of the shared Binance one, which pauses every subscriber's alerts
+scan_breaker = get_breaker('Binance scanner', failure_threshold=5, recovery_timeout=30)
+
+
+class MarketScanner:
+    """
+    Screens every Binance USDT pair with the bot's STT and breakout settings.
+
+    Klines are fetched concurrently (at most `max_concurrency` requests in flight) and cached per
+    (symbol, interval) until the next candle closes, so repeated scans of an interval within the same
+    candle don't hit the exchange again. All windows are evaluated in one batch off the event loop.
+    Concurrent scans of the same interval share one run.
+    """
+
+    def __init__(self, fetch: Optional[Callable[[str, str, int], Awaitable[pd.DataFrame]]] = None,
+                 max_concurrency: int = 20, top: int = 15):
+        """
+        :param fetch: Coroutine function (symbol, interval, limit) returning klines including the open candle.
+            Defaults to `fetch_klines` on the scanner's own thread pool, the default executor is far
+            smaller than `max_concurrency` on small machines.
+        :param max_concurrency: Kline requests in flight at once.
+        :param top: Symbols listed in the summary.
+        """
+        self.fetch = fetch or self._fetch_klines
+        self.max_concurrency = max_concurrency
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.top = top
+        self._windows: dict[tuple[str, str], pd.DataFrame] = {}
+        self._symbols: list[str] = []
+        self._symbols_fetched_at: float = 0
+        self._scans: dict[str, asyncio.Task] = {}
+
+    async def _fetch_klines(self, symbol: str, interval: str, limit: int) -> pd.DataFrame:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.max_concurrency, thread_name_prefix='scanner')
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, lambda: fetch_klines(symbol=symbol, interval=interval, limit=limit, max_retries=2,
+                                                 circuit_breaker=scan_breaker)
+        )
+
+    async def symbols(self) -> list[str]:
+        if not self._symbols or time.monotonic() - self._symbols_fetched_at > SYMBOLS_TTL:
+            self._symbols = await asyncio.to_thread(fetch_usdt_symbols)
+            self._symbols_fetched_at = time.monotonic()
+        return self._symbols
+
+    async def scan(self, interval: str) -> dict[str, Any]:
+        """
+        Scan all USDT pairs on `interval`.
+
+        :return: Dict with the ranked 'results', the number of 'scanned' and 'failed' symbols,
+            the 'fetched' (not cached) windows and the scan 'duration' in seconds.
+        """
+        task = self._scans.get(interval)
+        if task is None:
+            task = self._scans[interval] = asyncio.create_task(self._scan(interval))
+            task.add_done_callback(lambda _: self._scans.pop(interval, None))
+        return await asyncio.shield(task)
+
+    async def _scan(self, interval: str) -> dict[str, Any]:
+        started = time.perf_counter()
+        symbols = await self.symbols()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        fetched = 0
+
+        async def window(symbol: str) -> Optional[pd.DataFrame]:
+            nonlocal fetched
+            cached = self._windows.get((symbol, interval))
+            if cached is not None and self._is_current(cached, interval):
+                return cached
+
+            async with semaphore:
+                try:
+                    df = await self.fetch(symbol, interval, SCAN_LOOKBACK + 1)
+                except Exception as e:
+                    logger.debug(f"Scan fetch of {symbol} ({interval}) failed: {e}")
+                    return None
+            fetched += 1
+            df = df[df['Close Time'] < pd.Timestamp(utc_timestamp(), unit='s')].iloc[-SCAN_LOOKBACK:]
+            self._windows[(symbol, interval)] = df
+            return df
+
+        windows = await asyncio.gather(*(window(symbol) for symbol in symbols))
+        frames = {symbol: df for symbol, df in zip(symbols, windows) if df is not None and len(df) >= SCAN_LOOKBACK}
+        results = await asyncio.to_thread(self.evaluate_batch, frames)
+
+        duration = time.perf_counter() - started
+        logger.info(f"Scanned {len(frames)}/{len(symbols)} pairs on {interval} in {duration:.1f}s "
+                    f"({fetched} windows fetched)")
+        return {
+            'interval': interval,
+            'results': results,
+            'scanned': len(frames),
+            'failed': len(symbols) - len(frames),
+            'fetched': fetched,
+            'duration': duration,
+        }
+
+    @staticmethod
+    def _is_current(df: pd.DataFrame, interval: str) -> bool:
+        """The cached window still ends with the last closed candle."""
+        if df.empty:
+            return False
+        next_close = df['Close Time'].iloc[-1] + pd.Timedelta(seconds=parse_interval(interval))
+        return pd.Timestamp(utc_timestamp(), unit='s') <= next_close
+
+    @staticmethod
+    def evaluate_batch(frames: dict[str, pd.DataFrame]) -> list[dict[str, Any]]:
+        """Evaluate STT and breakout on every window and rank the symbols, strongest setups first."""
+        results = []
+        for symbol, df in frames.items():
+            conf = stt.evaluate(df.iloc[-stt.lookback:])
+            try:
+                breakout_info = breakout(df.iloc[-BREAKOUT_LOOKBACK:])
+            except IndexError:  # No support / resistance in the window
+                breakout_info = {'direction': None}
+            if conf == 0 and breakout_info['direction'] is None:
+                continue
+
+            close = df['Close'].iloc[-1]
+            level = breakout_info.get('resistance') if breakout_info['direction'] == 'above' else breakout_info.get('support')
+            results.append({
+                'symbol': symbol,
+                'stt': conf,
+                'breakout': breakout_info['direction'],
+                'distance': abs(close - level) / level * 100 if breakout_info['direction'] and level else 0.0,
+                'change': (close - df['Open'].iloc[-1]) / df['Open'].iloc[-1] * 100,
+                'quote_volume': close * df['Volume'].iloc[-1],
+            })
+
+        # Both signals first (the bot's alert condition), then STT, then breakouts by how far they broke
+        return sorted(results, key=lambda result: (
+            result['stt'] != 0 and result['breakout'] is not None,
+            result['stt'] != 0,
+            result['distance'],
+            result['quote_volume'],
+        ), reverse=True)
+
+    def format_summary(self, scan: dict[str, Any]) -> str:
+        results = scan['results']
+        message = (f"<b>🔎 Scan {scan['interval']}</b>: {len(results)} setups in {scan['scanned']} pairs "
+                   f"({scan['duration']:.1f}s)\n\n")
+        if not results:
+            return message + "Nothing found. (￣～￣;)"
+
+        message += "<code>"
+        message += "Symbol        STT  Breakout    Chg\n"
+        message += "─" * 36 + "\n"
+        for result in results[:self.top]:
+            stt_text = f"{result['stt']:+.0f}" if result['stt'] else "-"
+            breakout_text = f"{result['breakout']} {result['distance']:.1f}%" if result['breakout'] else "-"
+            message += f"{result['symbol']:<13} {stt_text:>3}  {breakout_text:<11} {result['change']:+.1f}%\n"
+        message += "</code>"
+        if scan['failed']:
+            message += f"\n⚠️ {scan['failed']} pairs skipped (fetch failed or too little history)"
+        return message
@@ -0,0 +1,2 @@
+from .sqliteBroker import SQLiteBroker, OUTAGE_ERROR_PREFIX
+from .evaluationWorker import EvaluationWorker
\ No newline at end of file
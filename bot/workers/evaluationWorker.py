@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+from typing import Optional
+
+from apis.binanceApi import fetch_server_time, ExchangeClock
+from apis.circuitBreaker import CircuitOpenError
+from apis.multiTimeframe import MultiTimeframeEngine
+from tradingComponents.Dow import ChartRenderer
+from ..additions import SignalStore, SignalHistory
+from utils import parse_interval, seconds_to_next_boundry
+from .sqliteBroker import SQLiteBroker, OUTAGE_ERROR_PREFIX
+from ..evaluation import evaluate_symbol, render_chart, create_gateway
+
+logger = logging.getLogger("oracle.link")
+
+
+class EvaluationWorker:
+    """
+    Evaluates the (symbol, interval) shards it leased from the broker at every candle boundary
+    and pushes the captions and rendered charts back for the bot to deliver.
+
+    Run as many workers as needed (on the same host, or wherever the broker file is reachable);
+    shards of a worker that stops renewing its lease are taken over by the others.
+    """
+
+    def __init__(
+            self,
+            broker: SQLiteBroker,
+            worker_id: Optional[str] = None,
+            max_shards: int = 200,
+            lease_seconds: float = 60,
+            chart_renderer: Optional[ChartRenderer] = None,
+            boundary_delay: float = 0.0,
+            clock_sync_interval: float = 600,
+            alltick_token: Optional[str] = None,
+            signal_cooldown: int = 3,
+            history: Optional[SignalHistory] = None
+    ):
+        """
+        :param broker: Broker shared with the bot.
+        :param worker_id: Unique id of this worker, defaults to <hostname>-<pid>.
+        :param max_shards: Maximum number of (symbol, interval) pairs evaluated by this worker.
+        :param lease_seconds: How long a claimed shard stays ours without renewal.
+        :param chart_renderer: Renderer for the charts, `plot_candle_chart` if None.
+        :param boundary_delay: Seconds to wait after a boundary before fetching the closed candle. Not
+            needed normally, boundaries follow the exchange clock and the closed candle is confirmed by the engine.
+        :param clock_sync_interval: Seconds between syncs of the local clock offset with Binance.
+        :param alltick_token: Alltick API token, needed for 'alltick:' symbols.
+        :param signal_cooldown: Candles a repeated signal of the same direction isn't sent again for, 0 sends every one.
+        :param history: Log of the evaluated signals, may be shared with the bot and other workers.
+        """
+        self.broker = broker
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.max_shards = max_shards
+        self.lease_seconds = lease_seconds
+        self.chart_renderer = chart_renderer
+        self.boundary_delay = boundary_delay
+        self.gateway = create_gateway(alltick_token)
+        self.market_data = MultiTimeframeEngine(fetch=self.gateway.fetch_klines)
+        self.signal_store = SignalStore(cooldown_candles=signal_cooldown)
+        self.history = history
+        self.next_run: dict[tuple[str, str], float] = {}
+        self.exchange_clock = ExchangeClock(fetch_server_time)
+        self.clock_sync_interval = clock_sync_interval
+        self._next_clock_sync: float = 0
+
+    def sync_shards(self):
+        claimed = set(self.broker.claim_shards(self.worker_id, self.max_shards, self.lease_seconds))
+        for symbol, interval in claimed - self.next_run.keys():
+            logger.info(f"Worker {self.worker_id} claimed {symbol} ({interval})")
+            self.market_data.register(symbol, interval)
+            self.next_run[(symbol, interval)] = self._next_boundary(interval)
+        for symbol, interval in self.next_run.keys() - claimed:
+            logger.info(f"Worker {self.worker_id} lost {symbol} ({interval})")
+            self.market_data.unregister(symbol, interval)
+            self.signal_store.forget(symbol, interval)
+            del self.next_run[(symbol, interval)]
+
+    def _next_boundary(self, interval: str) -> float:
+        return time.time() + seconds_to_next_boundry(parse_interval(interval)) + self.boundary_delay
+
+    async def evaluate_shard(self, symbol: str, interval: str):
+        send_always = self.broker.needs_chart(symbol, interval)
+        try:
+            evaluation = await evaluate_symbol(self.market_data, symbol, interval, send_always, self.signal_store,
+                                               self.history)
+            if evaluation is None:
+                return
+            buf = render_chart(self.chart_renderer, **evaluation['render_kwargs'])
+        except CircuitOpenError as e:
+            logger.warning(f"Skipping {symbol} ({interval}): {e}")
+            self.broker.push_result(symbol, interval, signal=False, error=f"{OUTAGE_ERROR_PREFIX}{e.source}")
+            return
+        except Exception as e:
+            logger.exception(f"Evaluation of {symbol} ({interval}) failed")
+            self.broker.push_result(symbol, interval, signal=False, error=str(e))
+            return
+
+        self.broker.push_result(symbol, interval, evaluation['signal'], evaluation['caption'], buf.getvalue())
+
+    async def run(self):
+        logger.info(f"Evaluation worker {self.worker_id} started")
+        try:
+            while True:
+                if time.time() >= self._next_clock_sync:
+                    await asyncio.to_thread(self.exchange_clock.sync)
+                    self._next_clock_sync = time.time() + self.clock_sync_interval
+
+                self.sync_shards()
+
+                now = time.time()
+                due = [shard for shard, next_run in self.next_run.items() if next_run <= now]
+                if due:
+                    await asyncio.gather(*(self.evaluate_shard(symbol, interval) for symbol, interval in due))
+                    for symbol, interval in due:
+                        self.next_run[(symbol, interval)] = self._next_boundary(interval)
+                    if self.history is not None:  # Results are pushed already, writing doesn't delay them
+                        await asyncio.to_thread(self.history.flush)
+
+                # Wake up for the next boundary, or early enough to renew the leases
+                wake_up = min(self.next_run.values(), default=float('inf'))
+                await asyncio.sleep(max(0.0, min(wake_up - time.time(), self.lease_seconds / 3)))
+        finally:
+            await self.gateway.close()
+            if self.history is not None:
+                self.history.close()
+            self.broker.release_shards(self.worker_id)
+            logger.info(f"Evaluation worker {self.worker_id} stopped")
+
+
+def main():
+    import argparse
+    from logging import DEBUG
+
+    from custom_logger import setup_logger
+
+    parser = argparse.ArgumentParser(description="OracleLink evaluation worker")
+    parser.add_argument('--db', required=True, help="Path of the broker database shared with the bot")
+    parser.add_argument('--worker-id', default=None)
+    parser.add_argument('--max-shards', type=int, default=200)
+    parser.add_argument('--log-file', default='./logs/worker.jsonl')
+    parser.add_argument('--alltick-token', default=os.getenv('ALLTICK_TOKEN'))
+    parser.add_argument('--signal-cooldown', type=int, default=3, help="Candles a repeated signal is suppressed for")
+    parser.add_argument('--history-db', default=os.getenv('SIGNAL_HISTORY_DB'), help="Signal history file")
+    # Same chart settings as the bot, so worker charts match the ones rendered in the bot process
+    parser.add_argument('--chart-format', default=os.getenv('CHART_FORMAT', 'png'), help="png, jpeg or webp")
+    parser.add_argument('--chart-dpi', type=int, default=int(os.getenv('CHART_DPI', 150)))
+    parser.add_argument('--chart-max-bytes', type=int, default=os.getenv('CHART_MAX_BYTES'),
+                        help="Byte budget per chart")
+    parser.add_argument('--chart-png-colors', type=int, default=os.getenv('CHART_PNG_COLORS'),
+                        help="PNG palette size, e.g. 64")
+    args = parser.parse_args()
+
+    setup_logger('oracle.link', DEBUG, args.log_file, log_in_json=False, stream_in_color=True)
+    worker = EvaluationWorker(SQLiteBroker(args.db), worker_id=args.worker_id, max_shards=args.max_shards,
+                              chart_renderer=ChartRenderer(dpi=args.chart_dpi, image_format=args.chart_format,
+                                                           max_bytes=args.chart_max_bytes,
+                                                           png_palette_colors=args.chart_png_colors),
+                              alltick_token=args.alltick_token,
+                              signal_cooldown=args.signal_cooldown,
+                              history=SignalHistory(args.history_db) if args.history_db else None)
+    try:
+        asyncio.run(worker.run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
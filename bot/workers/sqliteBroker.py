@@ -0,0 +1,168 @@
+import sqlite3
+import time
+from typing import Any, Optional
+
+# Error of a result whose data source is down, followed by the source name
+OUTAGE_ERROR_PREFIX: str = 'outage:'
+
+SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS subscriptions (
+    user_id INTEGER NOT NULL,
+    chat_id INTEGER NOT NULL,
+    symbol TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    send_always INTEGER NOT NULL,
+    PRIMARY KEY (user_id, symbol, interval, send_always)
+);
+CREATE INDEX IF NOT EXISTS subscriptions_shard ON subscriptions (symbol, interval);
+
+CREATE TABLE IF NOT EXISTS shards (
+    symbol TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    worker_id TEXT,
+    lease_until REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (symbol, interval)
+);
+
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    symbol TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    signal INTEGER NOT NULL,
+    caption TEXT,
+    photo BLOB,
+    error TEXT,
+    created REAL NOT NULL
+);
+"""
+
+
+class SQLiteBroker:
+    """
+    Local broker between the Telegram front-end and evaluation workers, backed by one SQLite file.
+
+    The bot writes subscriptions, workers lease shards of (symbol, interval) pairs, evaluate them
+    and push results, which the bot pops and delivers to the subscribers. Every process opens its
+    own broker on the same path; WAL mode lets readers and the single writer work concurrently.
+    """
+
+    def __init__(self, path: str, busy_timeout: float = 10.0):
+        self.path = path
+        self._connection = sqlite3.connect(path, timeout=busy_timeout, isolation_level=None, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(SCHEMA)
+
+    def close(self):
+        self._connection.close()
+
+    def _transaction(self):
+        return _Transaction(self._connection)
+
+    # ---- Front-end side ----
+    def subscribe(self, user_id: int, chat_id: int, watchlist: list[tuple[str, str, bool]]):
+        with self._transaction() as cursor:
+            for symbol, interval, send_always in watchlist:
+                cursor.execute(
+                    "INSERT OR IGNORE INTO subscriptions VALUES (?, ?, ?, ?, ?)",
+                    (user_id, chat_id, symbol, interval, int(bool(send_always)))
+                )
+                cursor.execute("INSERT OR IGNORE INTO shards (symbol, interval) VALUES (?, ?)", (symbol, interval))
+
+    def unsubscribe(self, user_id: int):
+        with self._transaction() as cursor:
+            cursor.execute("DELETE FROM subscriptions WHERE user_id = ?", (user_id,))
+            cursor.execute(
+                "DELETE FROM shards WHERE NOT EXISTS (SELECT 1 FROM subscriptions s "
+                "WHERE s.symbol = shards.symbol AND s.interval = shards.interval)"
+            )
+
+    def subscription_count(self, user_id: Optional[int] = None) -> int:
+        if user_id is None:
+            return self._connection.execute("SELECT COUNT(*) FROM subscriptions").fetchone()[0]
+        return self._connection.execute(
+            "SELECT COUNT(*) FROM subscriptions WHERE user_id = ?", (user_id,)
+        ).fetchone()[0]
+
+    def subscribers(self, symbol: str, interval: str) -> list[tuple[int, int, bool]]:
+        """
+        (chat_id, user_id, send_always) of everyone watching the shard, one entry per chat.
+        If several users of a group chat watch it, `user_id` is the lowest of them.
+        """
+        rows = self._connection.execute(
+            "SELECT chat_id, MIN(user_id), MAX(send_always) FROM subscriptions "
+            "WHERE symbol = ? AND interval = ? GROUP BY chat_id",
+            (symbol, interval)
+        ).fetchall()
+        return [(chat_id, user_id, bool(send_always)) for chat_id, user_id, send_always in rows]
+
+    def pop_results(self, limit: int = 100) -> list[dict[str, Any]]:
+        with self._transaction() as cursor:
+            rows = cursor.execute(
+                "SELECT id, symbol, interval, signal, caption, photo, error, created FROM results ORDER BY id LIMIT ?",
+                (limit,)
+            ).fetchall()
+            if rows:
+                cursor.execute("DELETE FROM results WHERE id <= ?", (rows[-1][0],))
+
+        keys = ('id', 'symbol', 'interval', 'signal', 'caption', 'photo', 'error', 'created')
+        return [dict(zip(keys, row)) for row in rows]
+
+    # ---- Worker side ----
+    def claim_shards(self, worker_id: str, max_shards: int, lease_seconds: float) -> list[tuple[str, str]]:
+        """
+        Renew the leases of this worker and claim free or expired shards up to `max_shards`.
+
+        :return: All shards currently leased by the worker.
+        """
+        now = time.time()
+        with self._transaction() as cursor:
+            cursor.execute(
+                "UPDATE shards SET lease_until = ? WHERE worker_id = ?", (now + lease_seconds, worker_id)
+            )
+            owned = cursor.execute("SELECT COUNT(*) FROM shards WHERE worker_id = ?", (worker_id,)).fetchone()[0]
+            if owned < max_shards:
+                cursor.execute(
+                    "UPDATE shards SET worker_id = ?, lease_until = ? WHERE rowid IN ("
+                    "SELECT rowid FROM shards WHERE worker_id IS NULL OR lease_until < ? LIMIT ?)",
+                    (worker_id, now + lease_seconds, now, max_shards - owned)
+                )
+            return cursor.execute(
+                "SELECT symbol, interval FROM shards WHERE worker_id = ?", (worker_id,)
+            ).fetchall()
+
+    def release_shards(self, worker_id: str):
+        with self._transaction() as cursor:
+            cursor.execute("UPDATE shards SET worker_id = NULL, lease_until = 0 WHERE worker_id = ?", (worker_id,))
+
+    def needs_chart(self, symbol: str, interval: str) -> bool:
+        """True if someone receives this shard on every candle (send_always)."""
+        return self._connection.execute(
+            "SELECT 1 FROM subscriptions WHERE symbol = ? AND interval = ? AND send_always = 1 LIMIT 1",
+            (symbol, interval)
+        ).fetchone() is not None
+
+    def push_result(self, symbol: str, interval: str, signal: bool, caption: Optional[str] = None,
+                    photo: Optional[bytes] = None, error: Optional[str] = None):
+        with self._transaction() as cursor:
+            cursor.execute(
+                "INSERT INTO results (symbol, interval, signal, caption, photo, error, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (symbol, interval, int(signal), caption, photo, error, time.time())
+            )
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT / ROLLBACK, so concurrent claims never hand a shard to two workers."""
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+
+    def __enter__(self) -> sqlite3.Cursor:
+        self.cursor = self.connection.cursor()
+        self.cursor.execute("BEGIN IMMEDIATE")
+        return self.cursor
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.cursor.execute("ROLLBACK" if exc_type else "COMMIT")
+        self.cursor.close()
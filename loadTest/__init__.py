@@ -0,0 +1,2 @@
+from .fakeBinance import FakeBinanceServer
+from .fakeTelegram import FakeTelegramServer
\ No newline at end of file
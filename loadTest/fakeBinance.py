@@ -0,0 +1,144 @@
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Optional
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+import pandas as pd
+
+from utils import parse_interval, utc_timestamp
+
+
+class FakeBinanceServer:
+    """
+    Local stand-in for the Binance REST endpoints the bot uses (klines, time, exchangeInfo, ping).
+
+    Candles are synthetic and deterministic per (symbol, open time), or replayed from recorded
+    klines, and always line up with the (offset corrected) clock of `utils.utc_timestamp`, so
+    moving the clock offset fast-forwards the market.
+    """
+
+    def __init__(
+            self,
+            host: str = '127.0.0.1',
+            port: int = 0,
+            latency: float = 0.0,
+            error_rate: float = 0.0,
+            recorded: Optional[dict[tuple[str, str], pd.DataFrame]] = None,
+            symbols: Optional[list[str]] = None
+    ):
+        """
+        :param port: 0 picks a free port, see `url`.
+        :param latency: Seconds every response is delayed.
+        :param error_rate: Share of kline requests answered with a 503.
+        :param recorded: Klines to replay by (symbol, interval), looped over time.
+        :param symbols: Symbols listed in exchangeInfo.
+        """
+        self.latency = latency
+        self.error_rate = error_rate
+        self.recorded = recorded or {}
+        self.symbols = symbols or []
+        self.requests: int = 0
+        self.errors: int = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api"
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def klines(self, symbol: str, interval: str, limit: int) -> list[list]:
+        step = parse_interval(interval) * 1000
+        now = int(utc_timestamp() * 1000)
+        opens = (now // step - np.arange(limit)[::-1]) * step
+
+        recorded = self.recorded.get((symbol, interval))
+        if recorded is not None:
+            rows = recorded.iloc[(opens // step) % len(recorded)]
+            o, h, l, c, v = (rows[column].to_numpy(dtype=float) for column in ('Open', 'High', 'Low', 'Close', 'Volume'))
+        else:
+            o, h, l, c, v = self._synthetic(symbol, opens, step)
+
+        return [
+            [int(open_ms), f"{o[i]:.8f}", f"{h[i]:.8f}", f"{l[i]:.8f}", f"{c[i]:.8f}", f"{v[i]:.8f}",
+             int(open_ms + step - 1), f"{v[i] * c[i]:.8f}", 100, f"{v[i] / 2:.8f}", f"{v[i] * c[i] / 2:.8f}", "0"]
+            for i, open_ms in enumerate(opens)
+        ]
+
+    @staticmethod
+    def _synthetic(symbol: str, opens: np.ndarray, step: int):
+        seed = zlib.crc32(symbol.encode()) % 10_000
+        base = 10 + seed
+
+        def noise(t: np.ndarray, salt: float) -> np.ndarray:
+            value = np.sin(t * 12.9898 + seed * 78.233 + salt) * 43758.5453
+            return value - np.floor(value)  # Deterministic pseudo random in [0, 1)
+
+        t = opens / step
+        close = base * (1 + 0.05 * np.sin(opens / 3.6e6 / 7) + 0.01 * (noise(t, 1) - 0.5))
+        open_ = base * (1 + 0.05 * np.sin((opens - step) / 3.6e6 / 7) + 0.01 * (noise(t - 1, 1) - 0.5))
+        high = np.maximum(open_, close) * (1 + 0.004 * noise(t, 2))
+        low = np.minimum(open_, close) * (1 - 0.004 * noise(t, 3))
+        volume = 100 + 1000 * noise(t, 4)
+        return open_, high, low, close, volume
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, status: int, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                with server._lock:
+                    server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+
+                if url.path.endswith('/ping'):
+                    self._reply(200, {})
+                elif url.path.endswith('/time'):
+                    self._reply(200, {'serverTime': int(utc_timestamp() * 1000)})
+                elif url.path.endswith('/exchangeInfo'):
+                    self._reply(200, {'symbols': [
+                        {'symbol': symbol, 'status': 'TRADING', 'quoteAsset': 'USDT', 'baseAsset': symbol[:-4]}
+                        for symbol in server.symbols
+                    ]})
+                elif url.path.endswith('/ticker/price'):
+                    self._reply(200, [{'symbol': symbol, 'price': server.klines(symbol, '1m', 1)[0][4]}
+                                      for symbol in server.symbols])
+                elif url.path.endswith('/klines'):
+                    if random.random() < server.error_rate:
+                        with server._lock:
+                            server.errors += 1
+                        self._reply(503, {'code': 0, 'msg': '503 ERROR'})
+                        return
+                    self._reply(200, server.klines(query['symbol'], query['interval'], int(query.get('limit', 500))))
+                else:
+                    self._reply(404, {'code': -1, 'msg': f'Unknown path {url.path}'})
+
+        return Handler
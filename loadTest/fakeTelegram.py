@@ -0,0 +1,124 @@
+import json
+import re
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from itertools import count
+from typing import Optional
+from urllib.parse import parse_qs
+
+CHAT_ID_PATTERN = re.compile(rb'name="chat_id"\r\n\r\n(-?\d+)')
+SEND_METHODS: tuple[str, ...] = ('sendMessage', 'sendPhoto', 'sendMediaGroup')
+
+
+class FakeTelegramServer:
+    """
+    Local stand-in for the Telegram Bot API. Answers every method with a plausible result and
+    records when each message for a chat arrived, which is what the load test measures.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0):
+        """
+        :param port: 0 picks a free port, see `base_url`.
+        :param latency: Seconds every response is delayed.
+        """
+        self.latency = latency
+        # (method, chat_id, perf_counter timestamp, body size)
+        self.sent: list[tuple[str, Optional[int], float, int]] = []
+        self._lock = threading.Lock()
+        self._message_ids = count(1)
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/bot"
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset(self):
+        with self._lock:
+            self.sent.clear()
+
+    def _message(self, chat_id: Optional[int], photo: bool) -> dict:
+        message_id = next(self._message_ids)
+        message = {
+            'message_id': message_id,
+            'date': int(time.time()),
+            'chat': {'id': chat_id or 0, 'type': 'private'},
+        }
+        if photo:
+            message['photo'] = [{'file_id': f'photo-{message_id}', 'file_unique_id': f'u-{message_id}',
+                                 'width': 1500, 'height': 1050}]
+        return message
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                received = time.perf_counter()
+                method = self.path.rsplit('/', 1)[-1]
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+                chat_id = self._chat_id(body)
+                if method in SEND_METHODS:
+                    with server._lock:
+                        server.sent.append((method, chat_id, received, len(body)))
+                if server.latency:
+                    time.sleep(server.latency)
+
+                if method == 'getMe':
+                    result = {'id': 1, 'is_bot': True, 'first_name': 'OracleLink', 'username': 'oracle_link_bot',
+                              'can_join_groups': False, 'can_read_all_group_messages': False,
+                              'supports_inline_queries': False}
+                elif method == 'sendMessage':
+                    result = server._message(chat_id, photo=False)
+                elif method == 'sendPhoto':
+                    result = server._message(chat_id, photo=True)
+                elif method == 'sendMediaGroup':
+                    media = self._media_count(body)
+                    result = [server._message(chat_id, photo=True) for _ in range(media)]
+                elif method == 'getUpdates':
+                    result = []
+                else:  # setWebhook, deleteWebhook, answerCallbackQuery, editMessageText, ...
+                    result = True
+
+                payload = json.dumps({'ok': True, 'result': result}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _chat_id(self, body: bytes) -> Optional[int]:
+                content_type = self.headers.get('Content-Type', '')
+                if content_type.startswith('multipart/form-data'):
+                    match = CHAT_ID_PATTERN.search(body)
+                    return int(match.group(1)) if match else None
+                if content_type.startswith('application/json'):
+                    chat_id = json.loads(body or b'{}').get('chat_id')
+                else:
+                    chat_id = parse_qs(body.decode()).get('chat_id', [None])[0]
+                return int(chat_id) if chat_id is not None else None
+
+            def _media_count(self, body: bytes) -> int:
+                match = re.search(rb'name="media"\r\n\r\n(\[.*?\])\r\n', body, re.S)
+                if match is None:
+                    match = re.search(rb'"media":\s*"?(\[.*?\])', body, re.S)
+                try:
+                    return len(json.loads(match.group(1))) if match else 1
+                except ValueError:
+                    return 1
+
+        return Handler
@@ -0,0 +1,225 @@
+import asyncio
+import logging
+import os
+import random
+import resource
+import tempfile
+import time
+from typing import Any, Optional
+
+import numpy as np
+from telegram import Update
+
+from apis.binanceApi import fetcher as binance_fetcher
+from bot import OracleLinkBot
+from tradingComponents.Dow import ChartRenderer
+from utils import parse_interval, utc_timestamp, set_clock_offset, get_clock_offset
+from .fakeBinance import FakeBinanceServer
+from .fakeTelegram import FakeTelegramServer
+
+logger = logging.getLogger("oracle.link")
+
+USER_ID_START: int = 10_000
+
+
+def command_update(update_id: int, user_id: int, text: str) -> dict[str, Any]:
+    """Recorded-style Update JSON of a private chat command."""
+    command = text.split()[0]
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': user_id, 'type': 'private'},
+            'from': {'id': user_id, 'is_bot': False, 'first_name': f'user{user_id}', 'username': f'user{user_id}'},
+            'text': text,
+            'entities': [{'type': 'bot_command', 'offset': 0, 'length': len(command)}],
+        },
+    }
+
+
+def percentiles(values: list[float]) -> dict[str, float]:
+    if not values:
+        return {'p50': 0.0, 'p90': 0.0, 'p99': 0.0, 'max': 0.0}
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {'p50': float(p50), 'p90': float(p90), 'p99': float(p99), 'max': float(max(values))}
+
+
+async def populate_users(app, users: int, symbols: list[str], watch_per_user: int, intervals: list[str],
+                         send_always_share: float, seed: int) -> int:
+    """Send /add and /start for every synthetic user through the real handlers."""
+    rng = random.Random(seed)
+    update_id = 0
+    subscriptions = 0
+    for user_id in range(USER_ID_START, USER_ID_START + users):
+        watched = rng.sample([(symbol, interval) for symbol in symbols for interval in intervals], watch_per_user)
+        for symbol, interval in watched:
+            update_id += 1
+            send_always = ' true' if rng.random() < send_always_share else ''
+            await app.process_update(Update.de_json(
+                command_update(update_id, user_id, f"/add {symbol} {interval}{send_always}"), app.bot
+            ))
+            subscriptions += 1
+        update_id += 1
+        await app.process_update(Update.de_json(command_update(update_id, user_id, "/start"), app.bot))
+    return subscriptions
+
+
+async def run_load_test(
+        users: int = 100,
+        symbols: int = 20,
+        watch_per_user: int = 5,
+        intervals: Optional[list[str]] = None,
+        boundaries: int = 10,
+        exchange_latency: float = 0.05,
+        exchange_error_rate: float = 0.0,
+        telegram_latency: float = 0.05,
+        send_always_share: float = 0.2,
+        text_first_alerts: bool = False,
+        chart_format: str = 'png',
+        chart_max_bytes: Optional[int] = None,
+        seed: int = 0
+) -> dict[str, Any]:
+    """
+    Boot `OracleLinkBot` against a fake Binance and a fake Bot API, subscribe synthetic users and
+    fast-forward the clock over `boundaries` boundaries of the finest interval, firing every due job.
+
+    Latency of an alert is measured from the moment its boundary was triggered to the moment the
+    fake Bot API received the message.
+    """
+    intervals = intervals or ['1m', '5m', '15m', '1h']
+    symbol_names = [f"SYM{index}USDT" for index in range(symbols)]
+
+    binance = FakeBinanceServer(latency=exchange_latency, error_rate=exchange_error_rate, symbols=symbol_names)
+    telegram = FakeTelegramServer(latency=telegram_latency)
+    binance.start()
+    telegram.start()
+    original_api_url = binance_fetcher.client.API_URL
+    binance_fetcher.client.API_URL = binance.url
+    original_offset = get_clock_offset()
+    persistence_dir = tempfile.mkdtemp(prefix='oracle_link_load_')
+
+    chart_renderer = ChartRenderer(image_format=chart_format, max_bytes=chart_max_bytes)
+    bot = OracleLinkBot(
+        token='123456:LOADTEST',
+        chart_renderer=chart_renderer,
+        text_first_alerts=text_first_alerts,
+        base_url=telegram.base_url,
+        persistence_path=os.path.join(persistence_dir, 'users.pkl'),
+    )
+    app = bot.app
+
+    try:
+        await app.initialize()
+        await bot.post_init(app)
+
+        started = time.perf_counter()
+        subscriptions = await populate_users(app, users, symbol_names, min(watch_per_user, symbols * len(intervals)),
+                                             intervals, send_always_share, seed)
+        setup_seconds = time.perf_counter() - started
+        logger.info(f"Subscribed {users} users to {subscriptions} (symbol, interval) pairs in {setup_seconds:.1f}s")
+
+        finest = min(parse_interval(interval) for interval in intervals)
+        latencies: list[float] = []
+        boundary_seconds: list[float] = []
+        jobs_run = 0
+        messages = 0
+        upload_bytes = 0
+        usage_before = resource.getrusage(resource.RUSAGE_SELF)
+        wall_started = time.perf_counter()
+
+        for _ in range(boundaries):
+            # Jump to just after the next boundary of the finest interval
+            now = utc_timestamp()
+            boundary = (now // finest + 1) * finest
+            set_clock_offset(get_clock_offset() + boundary + 0.5 - now)
+
+            due = [job for job in app.job_queue.jobs()
+                   if job.data and boundary % parse_interval(job.data['interval']) == 0]
+            telegram.reset()
+            triggered = time.perf_counter()
+            await asyncio.gather(*(job.run(app) for job in due))
+            boundary_seconds.append(time.perf_counter() - triggered)
+
+            jobs_run += len(due)
+            messages += len(telegram.sent)
+            upload_bytes += sum(size for *_, size in telegram.sent)
+            latencies.extend(received - triggered for _, _, received, _ in telegram.sent)
+
+        wall = time.perf_counter() - wall_started
+        usage_after = resource.getrusage(resource.RUSAGE_SELF)
+        cpu = (usage_after.ru_utime - usage_before.ru_utime) + (usage_after.ru_stime - usage_before.ru_stime)
+        chart_stats = chart_renderer.encoding_stats
+        last_chart = chart_stats['last'] or {}
+
+        return {
+            'users': users,
+            'subscriptions': subscriptions,
+            'boundaries': boundaries,
+            'jobs_run': jobs_run,
+            'messages': messages,
+            'alert_latency_seconds': percentiles(latencies),
+            'boundary_seconds': percentiles(boundary_seconds),
+            'jobs_per_second': jobs_run / wall if wall else 0.0,
+            'messages_per_second': messages / wall if wall else 0.0,
+            'upload_megabytes': upload_bytes / 1e6,
+            'chart_kilobytes': chart_stats['average_bytes'] / 1024,
+            'chart_encodes_per_chart': chart_stats['attempts_per_chart'],
+            'chart_encode_seconds': chart_stats['encode_seconds'],
+            'chart_settings': f"{chart_format} dpi={last_chart.get('dpi')} quality={last_chart.get('quality')} "
+                              f"palette={last_chart.get('palette_colors')}",
+            'cpu_seconds': cpu,
+            'cpu_utilization': cpu / wall if wall else 0.0,
+            'max_rss_megabytes': usage_after.ru_maxrss / 1024,
+            'exchange_requests': binance.requests,
+            'exchange_errors': binance.errors,
+        }
+    finally:
+        await app.shutdown()
+        set_clock_offset(original_offset)
+        binance_fetcher.client.API_URL = original_api_url
+        binance.stop()
+        telegram.stop()
+        for file_name in os.listdir(persistence_dir):
+            os.remove(os.path.join(persistence_dir, file_name))
+        os.rmdir(persistence_dir)
+
+
+def format_report(report: dict[str, Any]) -> str:
+    lines = []
+    for key, value in report.items():
+        if isinstance(value, dict):
+            value = ' | '.join(f"{name}: {number:.3f}" for name, number in value.items())
+        elif isinstance(value, float):
+            value = f"{value:.3f}"
+        lines.append(f"{key:<24} {value}")
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Offline load test of OracleLinkBot")
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--symbols', type=int, default=20)
+    parser.add_argument('--watch-per-user', type=int, default=5)
+    parser.add_argument('--intervals', nargs='+', default=['1m', '5m', '15m', '1h'])
+    parser.add_argument('--boundaries', type=int, default=10)
+    parser.add_argument('--exchange-latency', type=float, default=0.05)
+    parser.add_argument('--exchange-error-rate', type=float, default=0.0)
+    parser.add_argument('--telegram-latency', type=float, default=0.05)
+    parser.add_argument('--send-always-share', type=float, default=0.2)
+    parser.add_argument('--text-first', action='store_true')
+    parser.add_argument('--chart-format', default='png', choices=['png', 'jpeg', 'webp'])
+    parser.add_argument('--chart-max-bytes', type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    result = asyncio.run(run_load_test(
+        users=args.users, symbols=args.symbols, watch_per_user=args.watch_per_user, intervals=args.intervals,
+        boundaries=args.boundaries, exchange_latency=args.exchange_latency,
+        exchange_error_rate=args.exchange_error_rate, telegram_latency=args.telegram_latency,
+        send_always_share=args.send_always_share, text_first_alerts=args.text_first,
+        chart_format=args.chart_format, chart_max_bytes=args.chart_max_bytes,
+    ))
+    print(format_report(result))
@@ -5,10 +5,34 @@ from dotenv import load_dotenv
 
 from custom_logger import setup_logger
 from bot import OracleLinkBot
+from bot.workers import SQLiteBroker
+from bot.additions import WebhookConfig, MemoryMonitor, SignalHistory
+from tradingComponents.Dow import ChartRenderer
 
 load_dotenv(dotenv_path='.env.secret')
 
 token: str = os.getenv("TEL_BOT_TOKEN")
+chart_dpi: int = int(os.getenv("CHART_DPI", 150))
+chart_format: str = os.getenv("CHART_FORMAT", "png")  # png, jpeg or webp
+# Byte budget per chart, met by lowering quality and DPI; PNG palette size (e.g. 64) to shrink PNG charts
+chart_max_bytes: str | None = os.getenv("CHART_MAX_BYTES")
+chart_png_colors: str | None = os.getenv("CHART_PNG_COLORS")
+text_first_alerts: bool = os.getenv("TEXT_FIRST_ALERTS", "false").lower() == "true"
+# Default of /digest: charts of the same boundary are sent as albums
+digest_alerts: bool = os.getenv("DIGEST_ALERTS", "false").lower() == "true"
+# Worker mode: start workers with `python -m bot.workers.evaluationWorker --db <same path>`
+broker_db: str | None = os.getenv("WORKER_BROKER_DB")
+# Webhook mode: public HTTPS url forwarded to WEBHOOK_LISTEN:WEBHOOK_PORT/WEBHOOK_PATH
+webhook_url: str | None = os.getenv("WEBHOOK_URL")
+# Opt-in tracemalloc reports every MEMORY_MONITOR_INTERVAL seconds, /memory for ADMIN_IDS (comma separated)
+memory_monitor_interval: str | None = os.getenv("MEMORY_MONITOR_INTERVAL")
+alert_poll_interval: float = float(os.getenv("ALERT_POLL_INTERVAL", 5))
+alltick_token: str | None = os.getenv("ALLTICK_TOKEN")  # Enables 'alltick:EURUSD' watchlist entries
+# Candles a repeated signal of the same direction isn't sent again for
+signal_cooldown: int = int(os.getenv("SIGNAL_COOLDOWN_CANDLES", 3))
+# Log of every evaluated signal, queried with /history; workers take the same path through SIGNAL_HISTORY_DB
+signal_history_db: str = os.getenv("SIGNAL_HISTORY_DB", "./data/signalHistory/signals.db")
+admin_ids: set[int] = {int(user_id) for user_id in os.getenv("ADMIN_IDS", "").split(",") if user_id.strip()}
 
 def main():
     setup_logger(
@@ -20,8 +44,34 @@ def main():
         extra_log_args=['command'],
     )
 
+    chart_renderer = ChartRenderer(
+        dpi=chart_dpi,
+        image_format=chart_format,
+        max_bytes=int(chart_max_bytes) if chart_max_bytes else None,
+        png_palette_colors=int(chart_png_colors) if chart_png_colors else None,
+    )
     bot = OracleLinkBot(
-        token = token
+        token = token,
+        chart_renderer = chart_renderer,
+        text_first_alerts = text_first_alerts,
+        broker = SQLiteBroker(broker_db) if broker_db else None,
+        webhook = WebhookConfig(
+            webhook_url=webhook_url,
+            listen=os.getenv("WEBHOOK_LISTEN", "127.0.0.1"),
+            port=int(os.getenv("WEBHOOK_PORT", 8443)),
+            url_path=os.getenv("WEBHOOK_PATH", "telegram"),
+            secret_token=os.getenv("WEBHOOK_SECRET"),
+        ) if webhook_url else None,
+        memory_monitor = MemoryMonitor(
+            interval=float(memory_monitor_interval),
+            chart_renderer=chart_renderer,
+        ) if memory_monitor_interval else None,
+        admin_ids = admin_ids,
+        alert_poll_interval = alert_poll_interval,
+        alltick_token = alltick_token,
+        signal_cooldown = signal_cooldown,
+        history = SignalHistory(signal_history_db) if signal_history_db else None,
+        digest_alerts = digest_alerts
     )
     bot.run()
 
@@ -1,2 +1,2 @@
-from .dow import detect_dow_trend
-from .utils import plot_candle_chart
\ No newline at end of file
+from .dow import detect_dow_trend, DOW_LOOKBACK, DOW_COST
+from .utils import plot_candle_chart, ChartRenderer
\ No newline at end of file
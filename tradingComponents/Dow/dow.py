@@ -3,6 +3,9 @@ from scipy.signal import find_peaks
 
 from tradingComponents.Dow.utils.dowEnums import Trend, Phase
 
+DOW_LOOKBACK: int = 74  # Closed candles used to find peaks and valleys
+DOW_COST: float = 5  # Relative evaluation cost, used by the SignalPipeline
+
 # Initialize global variables
 last_trend = None
 last_trend_time = None
@@ -1 +1,2 @@
-from .plotter import plot_candle_chart
\ No newline at end of file
+from .plotter import plot_candle_chart
+from .chartRenderer import ChartRenderer
\ No newline at end of file
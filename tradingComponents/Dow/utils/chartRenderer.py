@@ -0,0 +1,355 @@
+from io import BytesIO
+from typing import Any, Optional
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.figure import Figure
+from PIL import Image
+
+logger = logging.getLogger("oracle.link")
+
+UP_COLOR: str = '#00b060'
+DOWN_COLOR: str = '#fe3032'
+SMA_COLOR: str = 'orange'
+BODY_WIDTH: float = 0.6
+MAX_X_TICKS: int = 6
+SUPPORTED_FORMATS: tuple[str, ...] = ('png', 'jpeg', 'webp')
+LOSSY_FORMATS: tuple[str, ...] = ('jpeg', 'webp')
+QUALITY_STEP: int = 10  # Quality decrease per attempt when over the byte budget
+DPI_STEP: float = 0.8  # Scale factor per attempt once the quality is at its minimum
+MIN_PALETTE_COLORS: int = 16  # Smallest PNG palette used to meet the budget, charts stay readable
+
+
+class _ChartTemplate:
+    """Pre-built figure, axes and data artists for one chart layout."""
+
+    def __init__(self, candle_count: int, sma: Optional[int], figsize: tuple[float, float], dpi: int):
+        self.candle_count = candle_count
+        self.x = np.arange(candle_count, dtype=float)
+
+        # Built at the output DPI so encoding never has to re-layout the figure
+        self.fig = Figure(figsize=figsize, dpi=dpi)
+        self.canvas = FigureCanvasAgg(self.fig)
+        grid = self.fig.add_gridspec(2, 1, height_ratios=(3, 1), hspace=0.05)
+        self.ax_price = self.fig.add_subplot(grid[0])
+        self.ax_volume = self.fig.add_subplot(grid[1], sharex=self.ax_price)
+
+        for ax in (self.ax_price, self.ax_volume):
+            ax.grid(True, linestyle=':', color='gray')
+            ax.yaxis.tick_right()
+            ax.yaxis.set_label_position('right')
+            ax.set_xlim(-1, candle_count)
+        self.ax_price.tick_params(labelbottom=False)
+        self.ax_volume.set_ylabel('Volume')
+
+        self.wicks = LineCollection([], linewidths=1, zorder=2)
+        self.bodies = PolyCollection([], linewidths=0.5, zorder=3)
+        self.volume = PolyCollection([], linewidths=0, alpha=0.6)
+        self.ax_price.add_collection(self.wicks)
+        self.ax_price.add_collection(self.bodies)
+        self.ax_volume.add_collection(self.volume)
+
+        self.sma_line = None
+        if sma:
+            self.sma_line, = self.ax_price.plot([], [], color=SMA_COLOR, linewidth=1.2, label=f'SMA ({sma})', zorder=4)
+
+        self.peaks = self.ax_price.scatter([], [], s=100, marker='^', color='red', label='Peaks', zorder=5)
+        self.valleys = self.ax_price.scatter([], [], s=100, marker='v', color='green', label='Valleys', zorder=5)
+        self.support = self.ax_price.axhline(0, color='green', linestyle='--', label='Support')
+        self.resistance = self.ax_price.axhline(0, color='red', linestyle='--', label='Resistance')
+
+        self.title = self.fig.suptitle('', y=0.97)
+        self.fig.subplots_adjust(top=0.92, bottom=0.12)
+        self.ax_price.legend(loc='upper left', fontsize='small')
+        # Hidden after the legend is built, so the legend still shows their style
+        self.support.set_visible(False)
+        self.resistance.set_visible(False)
+
+
+class ChartRenderer:
+    """
+    Fast candle chart renderer that keeps a pre-built figure template per layout
+    and only swaps the data artists on every call, instead of rebuilding an
+    mplfinance style, figure and addplots for each alert like `plot_candle_chart`.
+
+    Templates are keyed by (candle count, SMA period, DPI). Figures are created without
+    pyplot, so they never end up in the global figure registry, and the Agg buffer is
+    encoded with Pillow directly instead of going through `savefig`.
+
+    With `max_bytes` set, charts over the budget are encoded again with a lower quality (JPEG,
+    WebP), as palette PNG, and finally downscaled to a lower effective DPI. The settings that met
+    the budget are the starting point of the next chart, so most charts are encoded once.
+    """
+
+    def __init__(self, dpi: int = 150, image_format: str = 'png', figsize: tuple[float, float] = (10, 7),
+                 png_compress_level: int = 3, jpeg_quality: int = 85, webp_quality: int = 80,
+                 png_palette_colors: Optional[int] = None, max_bytes: Optional[int] = None,
+                 min_dpi: int = 72, min_quality: int = 40):
+        """
+        :param dpi: Resolution used when encoding the chart.
+        :param image_format: Output format, 'png', 'jpeg' or 'webp'.
+        :param figsize: Figure size in inches.
+        :param png_compress_level: zlib level for PNG output (0-9). Lower is faster but larger.
+        :param jpeg_quality: Quality for JPEG output (1-95).
+        :param webp_quality: Quality for WebP output (1-100).
+        :param png_palette_colors: Quantize PNG output to this many colors (2-256). Charts only use
+            a handful of colors, so this is several times smaller at hardly visible cost.
+        :param max_bytes: Byte budget per chart, None disables it.
+        :param min_dpi: Lowest effective DPI used to meet the budget.
+        :param min_quality: Lowest JPEG/WebP quality used to meet the budget.
+        """
+        if image_format.lower() not in SUPPORTED_FORMATS:
+            raise ValueError(f"Unsupported image format: {image_format}. Use one of {', '.join(SUPPORTED_FORMATS)}")
+
+        self.dpi = dpi
+        self.image_format = image_format.lower()
+        self.figsize = figsize
+        self.png_compress_level = png_compress_level
+        self.jpeg_quality = jpeg_quality
+        self.webp_quality = webp_quality
+        self.png_palette_colors = png_palette_colors
+        self.max_bytes = max_bytes
+        self.min_dpi = min_dpi
+        self.min_quality = min_quality
+        self._templates: dict[tuple[int, Optional[int], int], _ChartTemplate] = {}
+        # Index into the budget steps that met the budget last, by (format, DPI)
+        self._budget_start: dict[tuple[str, int], int] = {}
+
+        self.last_encoding: Optional[dict[str, Any]] = None
+        self._encodings: int = 0
+        self._encoded_bytes: int = 0
+        self._attempts: int = 0
+        self._over_budget: int = 0
+        self._encode_seconds: float = 0
+
+    @property
+    def template_count(self) -> int:
+        return len(self._templates)
+
+    @property
+    def encoding_stats(self) -> dict[str, Any]:
+        """Totals of all encoded charts and the settings chosen for the last one."""
+        return {
+            'charts': self._encodings,
+            'average_bytes': self._encoded_bytes / self._encodings if self._encodings else 0,
+            'attempts_per_chart': self._attempts / self._encodings if self._encodings else 0,
+            'over_budget': self._over_budget,
+            'encode_seconds': self._encode_seconds,
+            'last': self.last_encoding,
+        }
+
+    def _get_template(self, candle_count: int, sma: Optional[int], dpi: int) -> _ChartTemplate:
+        key = (candle_count, sma or None, dpi)
+        template = self._templates.get(key)
+        if template is None:
+            logger.debug(f"Building chart template for {candle_count} candles (SMA: {sma}, DPI: {dpi})")
+            template = _ChartTemplate(candle_count, sma, self.figsize, dpi)
+            self._templates[key] = template
+        return template
+
+    def render(self, df: pd.DataFrame, peaks: list[int] = None, valleys: list[int] = None, trend_info=None,
+               sma: Optional[int] = None, symbol="NOT_PASSED", show_candles: Optional[int] = None,
+               breakout_info: dict[str, float | str] = None, dpi: Optional[int] = None,
+               image_format: Optional[str] = None) -> BytesIO:
+        """
+        Render a candlestick chart into an image buffer.
+
+        Accepts the same data arguments as `plot_candle_chart`.
+
+        :param dpi: Overrides the renderer's default DPI for this call.
+        :param image_format: Overrides the renderer's default image format for this call.
+        :return: Buffer positioned at 0 containing the encoded image.
+        """
+        if df.empty:
+            raise ValueError("Cannot plot: DataFrame is empty")
+        if len(df) < 2:
+            raise ValueError("Cannot plot: Insufficient data points")
+
+        peaks = np.asarray(peaks if peaks is not None else [], dtype=int)
+        valleys = np.asarray(valleys if valleys is not None else [], dtype=int)
+
+        sma_values = df['Close'].rolling(window=sma).mean().to_numpy() if sma else None
+
+        if show_candles and len(df) > show_candles:
+            offset = len(df) - show_candles
+            peaks = peaks[peaks >= offset] - offset
+            valleys = valleys[valleys >= offset] - offset
+            df = df.iloc[offset:]
+            if sma_values is not None:
+                sma_values = sma_values[offset:]
+
+        template = self._get_template(len(df), sma, dpi or self.dpi)
+        self._update_template(template, df, peaks, valleys, trend_info, sma_values, symbol, breakout_info)
+
+        return self._encode(template, (image_format or self.image_format).lower())
+
+    def _budget_steps(self, image_format: str, dpi: int) -> list[tuple[float, int, Optional[int]]]:
+        """(scale, quality, palette colors) to try in order, from the configured settings to the smallest."""
+        if image_format == 'png':
+            quality, min_quality = 0, 0
+            palettes = [self.png_palette_colors] if self.png_palette_colors else [None, 64]
+            if palettes[-1] > MIN_PALETTE_COLORS:
+                palettes.append(MIN_PALETTE_COLORS)
+        else:
+            quality = self.jpeg_quality if image_format == 'jpeg' else self.webp_quality
+            min_quality = min(quality, self.min_quality)
+            palettes = [None]
+
+        steps = [(1.0, quality, palette) for palette in palettes]
+        if image_format in LOSSY_FORMATS:
+            qualities = list(range(quality - QUALITY_STEP, min_quality, -QUALITY_STEP))
+            if min_quality != quality:
+                qualities.append(min_quality)
+            steps += [(1.0, q, None) for q in qualities]
+
+        scale = DPI_STEP
+        while dpi * scale >= self.min_dpi:
+            steps.append((scale, min_quality, palettes[-1]))
+            scale *= DPI_STEP
+        return steps
+
+    def _save(self, image: Image.Image, image_format: str, quality: int, palette_colors: Optional[int]) -> BytesIO:
+        buf = BytesIO()
+        if image_format == 'png':
+            if palette_colors:
+                image = image.quantize(colors=palette_colors, method=Image.Quantize.FASTOCTREE,
+                                       dither=Image.Dither.NONE)
+            image.save(buf, format='PNG', compress_level=self.png_compress_level)
+        elif image_format == 'jpeg':
+            image.save(buf, format='JPEG', quality=quality, optimize=True)
+        elif image_format == 'webp':
+            image.save(buf, format='WEBP', quality=quality, method=2)  # About twice as fast as the default, similar size
+        else:
+            raise ValueError(f"Unsupported image format: {image_format}")
+        buf.seek(0)
+        return buf
+
+    def _encode(self, template: _ChartTemplate, image_format: str) -> BytesIO:
+        started = time.perf_counter()
+        template.canvas.draw()
+        width, height = template.canvas.get_width_height(physical=True)
+        image = Image.frombuffer('RGBA', (width, height), template.canvas.buffer_rgba(), 'raw', 'RGBA', 0, 1)
+        image = image.convert('RGB')
+
+        dpi = round(template.fig.dpi)
+        steps = self._budget_steps(image_format, dpi)
+        index = self._budget_start.get((image_format, dpi), 0) if self.max_bytes is not None else 0
+        attempts = 0
+        while True:
+            scale, quality, palette_colors = steps[index]
+            scaled = image if scale == 1 else image.resize((round(width * scale), round(height * scale)),
+                                                           Image.Resampling.LANCZOS)
+            buf = self._save(scaled, image_format, quality, palette_colors)
+            size = buf.getbuffer().nbytes
+            attempts += 1
+            if self.max_bytes is None or size <= self.max_bytes or index == len(steps) - 1:
+                break
+            index += 1
+
+        over_budget = self.max_bytes is not None and size > self.max_bytes
+        if over_budget:
+            logger.warning(f"Chart is {size / 1024:.0f} KB even at the smallest settings, "
+                           f"budget is {self.max_bytes / 1024:.0f} KB")
+        if self.max_bytes is not None:
+            # Well under the budget, try the next better settings with the next chart
+            if index > 0 and size < self.max_bytes * 0.6:
+                index -= 1
+            self._budget_start[(image_format, dpi)] = index
+
+        self.last_encoding = {
+            'format': image_format,
+            'dpi': round(dpi * scale),
+            'quality': quality if image_format in LOSSY_FORMATS else None,
+            'palette_colors': palette_colors,
+            'bytes': size,
+            'attempts': attempts,
+        }
+        self._encodings += 1
+        self._encoded_bytes += size
+        self._attempts += attempts
+        self._over_budget += over_budget
+        self._encode_seconds += time.perf_counter() - started
+        return buf
+
+    @staticmethod
+    def _update_template(template: _ChartTemplate, df: pd.DataFrame, peaks: np.ndarray, valleys: np.ndarray,
+                         trend_info, sma_values: Optional[np.ndarray], symbol: str,
+                         breakout_info: Optional[dict[str, float | str]]):
+        x = template.x
+        opens = df['Open'].to_numpy(dtype=float)
+        highs = df['High'].to_numpy(dtype=float)
+        lows = df['Low'].to_numpy(dtype=float)
+        closes = df['Close'].to_numpy(dtype=float)
+        volumes = df['Volume'].to_numpy(dtype=float)
+
+        colors = np.where(closes >= opens, UP_COLOR, DOWN_COLOR)
+        half = BODY_WIDTH / 2
+        left, right = x - half, x + half
+
+        # Candles
+        body_low = np.minimum(opens, closes)
+        body_high = np.maximum(opens, closes)
+        template.bodies.set_verts(np.stack([
+            np.column_stack((left, body_low)),
+            np.column_stack((left, body_high)),
+            np.column_stack((right, body_high)),
+            np.column_stack((right, body_low)),
+        ], axis=1))
+        template.bodies.set_facecolors(colors)
+        template.bodies.set_edgecolors(colors)
+        template.wicks.set_segments(np.stack([np.column_stack((x, lows)), np.column_stack((x, highs))], axis=1))
+        template.wicks.set_colors(colors)
+
+        # Volume
+        zeros = np.zeros_like(volumes)
+        template.volume.set_verts(np.stack([
+            np.column_stack((left, zeros)),
+            np.column_stack((left, volumes)),
+            np.column_stack((right, volumes)),
+            np.column_stack((right, zeros)),
+        ], axis=1))
+        template.volume.set_facecolors(colors)
+
+        # SMA
+        if template.sma_line is not None:
+            template.sma_line.set_data(x, sma_values)
+
+        # Peaks and valleys
+        template.peaks.set_offsets(np.column_stack((x[peaks], closes[peaks])) if len(peaks) else np.empty((0, 2)))
+        template.valleys.set_offsets(np.column_stack((x[valleys], closes[valleys])) if len(valleys) else np.empty((0, 2)))
+
+        # Support and resistance
+        breakout_info = breakout_info or {}
+        for line, key in ((template.support, 'support'), (template.resistance, 'resistance')):
+            level = breakout_info.get(key)
+            line.set_visible(level is not None)
+            if level is not None:
+                line.set_ydata([level, level])
+
+        # Axes limits and labels
+        price_low, price_high = lows.min(), highs.max()
+        for key in ('support', 'resistance'):
+            if breakout_info.get(key) is not None:
+                price_low = min(price_low, breakout_info[key])
+                price_high = max(price_high, breakout_info[key])
+        padding = (price_high - price_low) * 0.05 or abs(price_high) * 0.01 or 1
+        template.ax_price.set_ylim(price_low - padding, price_high + padding)
+        template.ax_volume.set_ylim(0, (volumes.max() * 1.1) or 1)
+        template.ax_price.set_ylabel(f'Price ({symbol})')
+
+        step = max(1, len(x) // MAX_X_TICKS)
+        tick_positions = x[::step]
+        tick_labels = [timestamp.strftime('%b %d, %H:%M') for timestamp in df.index[::step]]
+        template.ax_volume.set_xticks(tick_positions, tick_labels, rotation=45, ha='right', fontsize='small')
+
+        if trend_info:
+            template.title.set_text(
+                f"{trend_info['trend'].value} - {trend_info['phase'].value} | Power: {trend_info['strength']:.5f} | "
+                f"Price: {trend_info['price']:.5f}"
+            )
+        else:
+            template.title.set_text("No Clear Trend Detected")
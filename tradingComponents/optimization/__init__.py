@@ -0,0 +1 @@
+from .parameterSweep import run_sweep, grid_search, random_search, backtest, load_history
\ No newline at end of file
@@ -0,0 +1,264 @@
+import itertools
+import logging
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+
+from tradingComponents.patterns import breakout_directions
+from tradingComponents.strategies import ShadowsTrendingTouch
+
+logger = logging.getLogger("oracle.link")
+
+VALUE_COLUMNS: list[str] = ['Open', 'High', 'Low', 'Close', 'Volume']
+DEFAULT_GRID: dict[str, list] = {
+    'sma_period': [5, 7, 9, 14, 21],
+    'shadow_to_body_ratio': [0.75, 1.0, 1.25, 1.5, 2.0],
+    'opposite_shadow_to_body_ratio_limit': [0.25, 1.0, 2.5, 5.5, None],
+    'breakout_order': [2, 3, 4, 6, 8],
+}
+BREAKOUT_WINDOW: int = 74  # Same window the bot evaluates breakout on
+
+# Attached shared memory blocks of a worker process, by dataset key
+_worker_datasets: dict[str, tuple[np.ndarray, np.ndarray, list[shared_memory.SharedMemory]]] = {}
+# Breakout only depends on the order, computed once per worker process and (dataset key, order)
+_worker_breakouts: dict[tuple[str, int], np.ndarray] = {}
+
+
+def load_history(path: str) -> pd.DataFrame:
+    """
+    Load locally stored klines (e.g. saved with `fetch_klines(...).to_csv(path)`).
+
+    Supports .csv, .pkl and .parquet files with at least 'Open Time', Open, High, Low, Close and Volume.
+    """
+    if path.endswith('.csv'):
+        df = pd.read_csv(path, index_col='Open Time', parse_dates=['Open Time'])
+    elif path.endswith('.pkl'):
+        df = pd.read_pickle(path)
+    elif path.endswith('.parquet'):
+        df = pd.read_parquet(path)
+    else:
+        raise ValueError(f"Unsupported history file: {path}")
+
+    if 'Close Time' not in df.columns:
+        step = df.index[1] - df.index[0]
+        df['Close Time'] = df.index + step - pd.Timedelta(milliseconds=1)
+    df['Close Time'] = pd.to_datetime(df['Close Time'])
+    return df
+
+
+def grid_search(grid: dict[str, list]) -> list[dict[str, Any]]:
+    """All combinations of the grid values."""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+
+
+def random_search(space: dict[str, list | tuple], samples: int, seed: Optional[int] = None) -> list[dict[str, Any]]:
+    """
+    Distinct random parameter combinations, each combination is only drawn once.
+
+    :param space: Per parameter either a list of choices or a (low, high) tuple sampled uniformly
+        (ints if both bounds are ints).
+    :param samples: Number of combinations to draw, fewer if the space has fewer combinations.
+    """
+    rng = random.Random(seed)
+    combinations = []
+    seen: set[tuple] = set()
+    attempts = 0
+    while len(combinations) < samples and attempts < samples * 100:
+        attempts += 1
+        params = {}
+        for key, values in space.items():
+            if isinstance(values, tuple):
+                low, high = values
+                params[key] = rng.randint(low, high) if isinstance(low, int) and isinstance(high, int) else rng.uniform(low, high)
+            else:
+                params[key] = rng.choice(values)
+        combination = tuple(params.values())
+        if combination in seen:
+            continue
+        seen.add(combination)
+        combinations.append(params)
+
+    if len(combinations) < samples:
+        logger.info(f"Parameter space exhausted after {len(combinations)} of {samples} random combinations")
+    return combinations
+
+
+class SharedDataset:
+    """Candle arrays of one (symbol, interval) placed in shared memory, so workers read them without copies."""
+
+    def __init__(self, key: str, df: pd.DataFrame):
+        values = df[VALUE_COLUMNS].to_numpy(dtype=np.float64)
+        times = np.column_stack((
+            df.index.to_numpy(dtype='datetime64[ns]').view(np.int64),
+            df['Close Time'].to_numpy(dtype='datetime64[ns]').view(np.int64),
+        ))
+
+        self.key = key
+        self._values_shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        self._times_shm = shared_memory.SharedMemory(create=True, size=max(times.nbytes, 1))
+        np.ndarray(values.shape, dtype=values.dtype, buffer=self._values_shm.buf)[:] = values
+        np.ndarray(times.shape, dtype=times.dtype, buffer=self._times_shm.buf)[:] = times
+        self.spec: tuple = (key, self._values_shm.name, values.shape, self._times_shm.name, times.shape)
+
+    def release(self):
+        for shm in (self._values_shm, self._times_shm):
+            shm.close()
+            shm.unlink()
+
+
+def _attach_datasets(specs: list[tuple]):
+    """Worker initializer, maps every shared dataset once per process."""
+    for key, values_name, values_shape, times_name, times_shape in specs:
+        # The parent unlinks the blocks, a tracking worker would unlink (or report) them on exit as well
+        values_shm = shared_memory.SharedMemory(name=values_name, track=False)
+        times_shm = shared_memory.SharedMemory(name=times_name, track=False)
+        values = np.ndarray(values_shape, dtype=np.float64, buffer=values_shm.buf)
+        times = np.ndarray(times_shape, dtype=np.int64, buffer=times_shm.buf)
+        _worker_datasets[key] = (values, times, [values_shm, times_shm])
+
+
+def _dataset_frame(key: str) -> pd.DataFrame:
+    values, times, _ = _worker_datasets[key]
+    df = pd.DataFrame(values, columns=VALUE_COLUMNS, copy=False)
+    df.index = pd.DatetimeIndex(times[:, 0].view('datetime64[ns]'), name='Open Time')
+    df['Close Time'] = times[:, 1].view('datetime64[ns]')
+    return df
+
+
+def backtest(df: pd.DataFrame, params: dict[str, Any], horizon: int = 5,
+             breakouts: Optional[np.ndarray] = None) -> dict[str, Any]:
+    """
+    Replay the bot's alert condition (STT signal and a breakout) over every closed candle.
+
+    A signal is scored with the return of the following `horizon` candles in the STT direction.
+
+    :param breakouts: `breakout_directions` of `df` for the combination's breakout order, computed if None.
+    """
+    stt = ShadowsTrendingTouch(
+        sma_period=params.get('sma_period', 7),
+        shadow_to_body_ratio=params.get('shadow_to_body_ratio', 1.25),
+        shadow_multiplier=params.get('shadow_multiplier', 1),
+        opposite_shadow_to_body_ratio_limit=params.get('opposite_shadow_to_body_ratio_limit', 5.5),
+        ignore_sma_touch=params.get('ignore_sma_touch', True)
+    )
+    closes = df['Close'].to_numpy(dtype=np.float64)
+    if breakouts is None:
+        breakouts = breakout_directions(closes, order=params.get('breakout_order', 4), window=BREAKOUT_WINDOW)
+
+    # Signal candles, each evaluated as the last closed candle like the bot does
+    conf = stt.evaluate_series(df)
+    candles = np.arange(max(stt.lookback, BREAKOUT_WINDOW) - 1, len(df) - horizon)
+    candles = candles[(conf[candles] != 0) & (breakouts[candles] != 0)]
+    entry = closes[candles]
+    returns = np.sign(conf[candles]) * (closes[candles + horizon] - entry) / entry
+
+    return {
+        'signals': len(returns),
+        'hit_rate': float((returns > 0).mean()) if len(returns) else 0.0,
+        'mean_return': float(returns.mean()) if len(returns) else 0.0,
+        'total_return': float(returns.sum()),
+    }
+
+
+def _run_task(task: tuple[str, dict[str, Any], int]) -> dict[str, Any]:
+    key, params, horizon = task
+    df = _dataset_frame(key)
+    order = params.get('breakout_order', 4)
+    breakouts = _worker_breakouts.get((key, order))
+    if breakouts is None:
+        breakouts = _worker_breakouts[(key, order)] = breakout_directions(
+            df['Close'].to_numpy(dtype=np.float64), order=order, window=BREAKOUT_WINDOW
+        )
+    return {'dataset': key, **params, **backtest(df, params, horizon, breakouts)}
+
+
+def rank_results(results: list[dict[str, Any]], params_keys: list[str], min_signals: int = 10) -> pd.DataFrame:
+    """Combine the per dataset results of every parameter set and sort by mean return per signal."""
+    df = pd.DataFrame(results)
+    df['weighted_return'] = df['mean_return'] * df['signals']
+    df['hits'] = df['hit_rate'] * df['signals']
+    grouped = df.groupby(params_keys, dropna=False).agg(
+        signals=('signals', 'sum'), total_return=('total_return', 'sum'),
+        weighted_return=('weighted_return', 'sum'), hits=('hits', 'sum'), datasets=('dataset', 'count'),
+    ).reset_index()
+    grouped['mean_return'] = grouped['weighted_return'] / grouped['signals'].where(grouped['signals'] > 0)
+    grouped['hit_rate'] = grouped['hits'] / grouped['signals'].where(grouped['signals'] > 0)
+    grouped = grouped.drop(columns=['weighted_return', 'hits'])
+    grouped = grouped[grouped['signals'] >= min_signals]
+    return grouped.sort_values(['mean_return', 'hit_rate', 'signals'], ascending=False).reset_index(drop=True)
+
+
+def run_sweep(
+        datasets: dict[str, pd.DataFrame],
+        combinations: list[dict[str, Any]],
+        horizon: int = 5,
+        max_workers: Optional[int] = None,
+        min_signals: int = 10
+) -> pd.DataFrame:
+    """
+    Backtest every parameter combination on every dataset using a process pool.
+
+    :param datasets: Klines by key (e.g. 'BTCUSDT_1h').
+    :param combinations: Parameter sets, see `grid_search` / `random_search`.
+    :param horizon: Candles after the signal used to score it.
+    :param max_workers: Worker processes, all cores if None.
+    :param min_signals: Parameter sets with fewer signals over all datasets are dropped from the ranking.
+    :return: Ranked results, best first.
+    """
+    shared = [SharedDataset(key, df) for key, df in datasets.items()]
+    tasks = [(key, params, horizon) for params in combinations for key in datasets]
+    max_workers = max_workers or os.cpu_count()
+    logger.info(f"Sweeping {len(combinations)} parameter sets over {len(datasets)} datasets "
+                f"({len(tasks)} backtests) with {max_workers} workers")
+
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_attach_datasets,
+                                 initargs=([dataset.spec for dataset in shared],)) as executor:
+            chunksize = max(1, len(tasks) // (max_workers * 8))
+            results = []
+            for index, result in enumerate(executor.map(_run_task, tasks, chunksize=chunksize), start=1):
+                results.append(result)
+                if index % 100 == 0:
+                    logger.info(f"{index}/{len(tasks)} backtests done")
+    finally:
+        for dataset in shared:
+            dataset.release()
+
+    params_keys = sorted({key for params in combinations for key in params})
+    return rank_results(results, params_keys, min_signals)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Parameter sweep for ShadowsTrendingTouch and breakout")
+    parser.add_argument('--data-dir', default=os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'history'),
+                        help="Directory with <SYMBOL>_<interval>.csv files")
+    parser.add_argument('--symbols', nargs='+', required=True)
+    parser.add_argument('--intervals', nargs='+', default=['1h'])
+    parser.add_argument('--mode', choices=['grid', 'random'], default='grid')
+    parser.add_argument('--samples', type=int, default=200, help="Combinations drawn in random mode")
+    parser.add_argument('--horizon', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--min-signals', type=int, default=10)
+    parser.add_argument('--output', default='sweep_results.csv')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    history = {
+        f"{symbol}_{interval}": load_history(os.path.join(args.data_dir, f"{symbol}_{interval}.csv"))
+        for symbol in args.symbols for interval in args.intervals
+    }
+    parameter_sets = (grid_search(DEFAULT_GRID) if args.mode == 'grid'
+                      else random_search(DEFAULT_GRID, args.samples))
+
+    ranked = run_sweep(history, parameter_sets, horizon=args.horizon, max_workers=args.workers,
+                       min_signals=args.min_signals)
+    ranked.to_csv(args.output, index=False)
+    print(ranked.head(20).to_string())
@@ -1 +1,2 @@
-from .breackout import breakout
\ No newline at end of file
+from .breackout import breakout, breakout_directions, BREAKOUT_LOOKBACK, BREAKOUT_COST
+from .candlestickPatterns import CANDLESTICK_PATTERNS, PATTERN_LOOKBACK, detect_patterns, last_candle_patterns
\ No newline at end of file
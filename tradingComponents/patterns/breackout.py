@@ -2,6 +2,9 @@ import numpy as np
 from pandas import Series
 from scipy.signal import argrelextrema
 
+BREAKOUT_LOOKBACK: int = 74  # Closed candles used to find support / resistance
+BREAKOUT_COST: float = 2  # Relative evaluation cost, used by the SignalPipeline
+
 
 def detect_support_resistance(price_data, order=15):
     local_max = argrelextrema(price_data['Close'].values, np.greater_equal, order=order)[0]
@@ -33,8 +36,31 @@ def check_breakout(last_close, nearest_support, nearest_resistance, close_time)
 
     return breakout_info
 
-def breakout(df) -> dict[str, float | str]:
-    support, resistance = detect_support_resistance(df.iloc[:-1], order=4)
+def breakout_directions(close_prices: np.ndarray, order: int = 4, window: int = BREAKOUT_LOOKBACK) -> np.ndarray:
+    """
+    `breakout` direction for every candle, evaluated on the `window` candles ending with it.
+
+    :return: Per candle 1 for 'above', -1 for 'below' and 0 for no breakout, no support / resistance
+        or fewer than `window` candles.
+    """
+    directions = np.zeros(len(close_prices), dtype=np.int8)
+    for end in range(window, len(close_prices) + 1):
+        levels = close_prices[end - window:end - 1]
+        local_max = argrelextrema(levels, np.greater_equal, order=order)[0]
+        local_min = argrelextrema(levels, np.less_equal, order=order)[0]
+        if not len(local_max) or not len(local_min):
+            continue
+
+        last_close = close_prices[end - 1]
+        nearest_support, nearest_resistance = levels[local_min[-1]], levels[local_max[-1]]
+        if nearest_support and last_close < nearest_support:
+            directions[end - 1] = -1
+        elif nearest_resistance and last_close > nearest_resistance:
+            directions[end - 1] = 1
+    return directions
+
+def breakout(df, order: int = 4) -> dict[str, float | str]:
+    support, resistance = detect_support_resistance(df.iloc[:-1], order=order)
     last_candle: Series = df.iloc[-1]  # کندل بسته‌شده‌ی آخر
     last_close: float = last_candle['Close']
     close_time: str = df.iloc[-1]['Close Time']
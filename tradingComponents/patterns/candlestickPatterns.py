@@ -0,0 +1,165 @@
+from typing import Callable, Optional
+
+import numpy as np
+from pandas import DataFrame
+
+# Every kernel takes the OHLC arrays of a series and returns one int8 per candle:
+# 1 bullish, -1 bearish, 0 no pattern. Direction-less patterns (doji, inside bar) use 1.
+# Multi candle patterns are reported on their last candle, the first candles of the series are 0.
+PatternKernel = Callable[..., np.ndarray]
+
+PATTERN_LOOKBACK: int = 3  # Candles needed to evaluate every pattern on the last candle
+
+
+def _ohlc(df: DataFrame) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    return (df['Open'].to_numpy(dtype=np.float64), df['High'].to_numpy(dtype=np.float64),
+            df['Low'].to_numpy(dtype=np.float64), df['Close'].to_numpy(dtype=np.float64))
+
+
+def _shifted(values: np.ndarray, periods: int) -> np.ndarray:
+    """`values` moved `periods` candles forward, padded with NaN so comparisons on the padding are False."""
+    result = np.empty_like(values)
+    result[:periods] = np.nan
+    result[periods:] = values[:-periods]
+    return result
+
+
+def doji(open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray,
+         body_ratio: float = 0.1) -> np.ndarray:
+    """Body at most `body_ratio` of the candle range."""
+    body = np.abs(close - open_)
+    candle_range = high - low
+    return ((body <= body_ratio * candle_range) & (candle_range > 0)).astype(np.int8)
+
+
+def hammer(open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray,
+           shadow_to_body_ratio: float = 2.0, opposite_shadow_to_body_ratio_limit: float = 0.5) -> np.ndarray:
+    """Long lower shadow and a small upper shadow, bullish (1)."""
+    body = np.abs(close - open_)
+    lower_shadow = np.minimum(open_, close) - low
+    upper_shadow = high - np.maximum(open_, close)
+    return ((body > 0) &
+            (lower_shadow >= shadow_to_body_ratio * body) &
+            (upper_shadow <= opposite_shadow_to_body_ratio_limit * body)).astype(np.int8)
+
+
+def shooting_star(open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                  shadow_to_body_ratio: float = 2.0, opposite_shadow_to_body_ratio_limit: float = 0.5) -> np.ndarray:
+    """Long upper shadow and a small lower shadow, bearish (-1)."""
+    body = np.abs(close - open_)
+    lower_shadow = np.minimum(open_, close) - low
+    upper_shadow = high - np.maximum(open_, close)
+    return -((body > 0) &
+             (upper_shadow >= shadow_to_body_ratio * body) &
+             (lower_shadow <= opposite_shadow_to_body_ratio_limit * body)).astype(np.int8)
+
+
+def engulfing(open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """Body engulfs the previous, opposite colored body. 1 bullish, -1 bearish."""
+    prev_open, prev_close = _shifted(open_, 1), _shifted(close, 1)
+    bullish = (prev_close < prev_open) & (close > open_) & (open_ <= prev_close) & (close >= prev_open)
+    bearish = (prev_close > prev_open) & (close < open_) & (open_ >= prev_close) & (close <= prev_open)
+    return bullish.astype(np.int8) - bearish.astype(np.int8)
+
+
+def inside_bar(open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """Range inside the previous candle's range."""
+    return ((high <= _shifted(high, 1)) & (low >= _shifted(low, 1))).astype(np.int8)
+
+
+def outside_bar(open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """Range exceeds the previous candle's range on both sides, direction of its close."""
+    outside = (high > _shifted(high, 1)) & (low < _shifted(low, 1))
+    return (outside * np.sign(close - open_)).astype(np.int8)
+
+
+def _star(open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray,
+          star_body_ratio: float, direction: int) -> np.ndarray:
+    first_open, first_close = _shifted(open_, 2), _shifted(close, 2)
+    star_open, star_close = _shifted(open_, 1), _shifted(close, 1)
+
+    first_body = direction * (first_open - first_close)  # Positive if the first candle goes against `direction`
+    star_body = np.abs(star_close - star_open)
+    midpoint = (first_open + first_close) / 2
+
+    pattern = ((first_body > 0) &
+               (star_body <= star_body_ratio * first_body) &
+               (direction * (close - open_) > 0) &
+               (direction * (close - midpoint) > 0))
+    return (direction * pattern).astype(np.int8)
+
+
+def morning_star(open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                 star_body_ratio: float = 0.3) -> np.ndarray:
+    """Long bearish candle, small star, bullish candle closing above the first one's midpoint. Bullish (1)."""
+    return _star(open_, high, low, close, star_body_ratio, 1)
+
+
+def evening_star(open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                 star_body_ratio: float = 0.3) -> np.ndarray:
+    """Long bullish candle, small star, bearish candle closing below the first one's midpoint. Bearish (-1)."""
+    return _star(open_, high, low, close, star_body_ratio, -1)
+
+
+CANDLESTICK_PATTERNS: dict[str, PatternKernel] = {
+    'doji': doji,
+    'hammer': hammer,
+    'shooting_star': shooting_star,
+    'engulfing': engulfing,
+    'inside_bar': inside_bar,
+    'outside_bar': outside_bar,
+    'morning_star': morning_star,
+    'evening_star': evening_star,
+}
+
+
+def detect_patterns(df: DataFrame, patterns: Optional[list[str]] = None) -> DataFrame:
+    """
+    Evaluate candlestick patterns over every candle, e.g. a full history for backtests.
+
+    :param df: Klines with Open, High, Low and Close.
+    :param patterns: Names from `CANDLESTICK_PATTERNS`, all if None.
+    :return: One int8 column per pattern, indexed like `df`.
+    """
+    ohlc = _ohlc(df)
+    names = patterns or list(CANDLESTICK_PATTERNS)
+    return DataFrame({name: CANDLESTICK_PATTERNS[name](*ohlc) for name in names}, index=df.index)
+
+
+def last_candle_patterns(df: DataFrame, patterns: Optional[list[str]] = None) -> dict[str, int]:
+    """
+    Patterns found on the last candle, only the last `PATTERN_LOOKBACK` candles are evaluated.
+
+    :return: Signal by pattern name, patterns that didn't match are left out.
+    """
+    ohlc = _ohlc(df.iloc[-PATTERN_LOOKBACK:])
+    names = patterns or list(CANDLESTICK_PATTERNS)
+    signals = {name: int(CANDLESTICK_PATTERNS[name](*ohlc)[-1]) for name in names}
+    return {name: signal for name, signal in signals.items() if signal != 0}
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Benchmark the candlestick pattern kernels")
+    parser.add_argument('--candles', type=int, default=5_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    closes = 100 + np.cumsum(rng.normal(0, 0.5, args.candles))
+    opens = np.concatenate(([closes[0]], closes[:-1])) + rng.normal(0, 0.1, args.candles)
+    highs = np.maximum(opens, closes) + np.abs(rng.normal(0, 0.4, args.candles))
+    lows = np.minimum(opens, closes) - np.abs(rng.normal(0, 0.4, args.candles))
+
+    total = 0.0
+    for name, kernel in CANDLESTICK_PATTERNS.items():
+        best = float('inf')
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            signals = kernel(opens, highs, lows, closes)
+            best = min(best, time.perf_counter() - started)
+        total += best
+        print(f"{name:<14} {args.candles / best / 1e6:8.1f} M candles/s  ({np.count_nonzero(signals)} signals)")
+    print(f"{'all patterns':<14} {args.candles / total / 1e6:8.1f} M candles/s")
@@ -0,0 +1 @@
+from .signalPipeline import SignalPipeline, PipelineStage
\ No newline at end of file
@@ -0,0 +1,103 @@
+from typing import Any, Awaitable, Callable, Optional
+import logging
+
+from pandas import DataFrame
+
+logger = logging.getLogger("oracle.link")
+
+
+class PipelineStage:
+    def __init__(
+            self,
+            name: str,
+            evaluate: Callable[[DataFrame], Any],
+            lookback: int,
+            cost: float,
+            gate: Optional[Callable[[Any], bool]] = None
+    ):
+        """
+        A single strategy / pattern evaluated by the `SignalPipeline`.
+
+        :param name: Key under which the result is stored.
+        :param evaluate: Callable taking a DataFrame of closed candles and returning the stage result.
+        :param lookback: Number of closed candles the stage needs.
+        :param cost: Relative evaluation cost, cheaper stages run first.
+        :param gate: Returns False if the result means no alert can be sent. None means the stage never blocks.
+        """
+        self.name = name
+        self.evaluate = evaluate
+        self.lookback = lookback
+        self.cost = cost
+        self.gate = gate
+
+    @classmethod
+    def from_strategy(cls, name: str, strategy: Any, gate: Optional[Callable[[Any], bool]] = None) -> 'PipelineStage':
+        """Create a stage from a strategy object declaring `evaluate`, `lookback` and `cost`."""
+        return cls(name, strategy.evaluate, lookback=strategy.lookback, cost=strategy.cost, gate=gate)
+
+    def passes(self, result: Any) -> bool:
+        return self.gate is None or self.gate(result)
+
+
+class SignalPipeline:
+    """
+    Evaluates stages from cheapest to most expensive and stops at the first gate that fails.
+
+    Candles are fetched lazily: the first fetch only covers the cheapest stage's lookback and
+    the window is widened once to the largest remaining lookback when a stage needs more.
+    """
+
+    def __init__(self, stages: list[PipelineStage]):
+        self.stages: list[PipelineStage] = sorted(stages, key=lambda stage: stage.cost)
+
+    @property
+    def lookback(self) -> int:
+        return max((stage.lookback for stage in self.stages), default=0)
+
+    def passed(self, results: dict[str, Any]) -> bool:
+        """True if every gated stage in `results` passed, i.e. the alert condition is met."""
+        return all(stage.passes(results[stage.name]) for stage in self.stages if stage.name in results)
+
+    def completed(self, results: dict[str, Any]) -> bool:
+        """True if every stage was evaluated, False for the partial results of a stopped run."""
+        return all(stage.name in results for stage in self.stages)
+
+    async def run(
+            self,
+            fetch: Callable[[int], Awaitable[DataFrame]],
+            send_always: bool = False,
+            confirm: Optional[Callable[[DataFrame, dict[str, Any]], bool]] = None,
+            partial: bool = False
+    ) -> Optional[tuple[DataFrame, dict[str, Any]]]:
+        """
+        :param fetch: Coroutine function returning the last `limit` closed candles.
+        :param send_always: If True gates are ignored and every stage is evaluated.
+        :param confirm: Called with the candles and results once the last gate passed, before the
+            remaining (ungated) stages. Returning False stops the run like a failed gate. Not called
+            if `send_always` is True.
+        :param partial: If True, a stopped run returns the DataFrame and the results evaluated so far
+            instead of None, see `completed`.
+        :return: The widest DataFrame fetched and the results by stage name, or None if a gate failed.
+            Each stage only sees the last `lookback` candles of that DataFrame.
+        """
+        df: Optional[DataFrame] = None
+        results: dict[str, Any] = {}
+        last_gate: int = max((index for index, stage in enumerate(self.stages) if stage.gate is not None), default=-1)
+
+        for index, stage in enumerate(self.stages):
+            if df is None:
+                df = await fetch(stage.lookback)
+            elif len(df) < stage.lookback:
+                df = await fetch(max(remaining.lookback for remaining in self.stages[index:]))
+
+            results[stage.name] = stage.evaluate(df.iloc[-stage.lookback:])
+
+            if not send_always and not stage.passes(results[stage.name]):
+                logger.debug(f"Pipeline stopped at '{stage.name}' after {index + 1}/{len(self.stages)} stages")
+                return (df, results) if partial else None
+
+            if index == last_gate and not send_always and confirm is not None and not confirm(df, results):
+                logger.debug(f"Pipeline stopped after '{stage.name}', signal not confirmed")
+                return (df, results) if partial else None
+
+        return df, results
@@ -2,11 +2,15 @@ from typing import Optional
 
 from pandas import DataFrame
 
-from tradingComponents.Dow import detect_dow_trend
+from tradingComponents.Dow import detect_dow_trend, DOW_LOOKBACK, DOW_COST
 from tradingComponents.Dow.utils.dowEnums import Trend
 
 
 class KianStrat:
+    # Needs the peaks and valleys of the Dow detection, see SignalPipeline
+    lookback: int = DOW_LOOKBACK
+    cost: float = DOW_COST + 1
+
     def __init__(self, check_trend: bool = True):
         self.check_trend = check_trend
 
@@ -1,4 +1,6 @@
 from typing import Optional
+
+import numpy as np
 from pandas import DataFrame
 from pandas_ta import sma as create_sma
 import logging
@@ -9,6 +11,8 @@ logger = logging.getLogger("oracle.link")
 ### Return stop based on shadow size
 
 class ShadowsTrendingTouch:
+    cost: float = 1  # Relative evaluation cost, used by the SignalPipeline
+
     def __init__(
             self,
             sma_period: int = 7,
@@ -23,8 +27,13 @@ class ShadowsTrendingTouch:
         self.opposite_shadow_to_body_ratio_limit = opposite_shadow_to_body_ratio_limit # shadow multiplier
         self.ignore_sma_touch: bool = ignore_sma_touch
 
+    @property
+    def lookback(self) -> int:
+        """Number of closed candles needed by `evaluate`."""
+        return self.sma_period + 1
+
     def evaluate(self, df: DataFrame) -> float:
-        valid_df_range: int = self.sma_period + 1
+        valid_df_range: int = self.lookback
         if len(df) < valid_df_range:
             return 0
 
@@ -78,3 +87,33 @@ class ShadowsTrendingTouch:
                 return -1
 
         return 0
+
+    def evaluate_series(self, df: DataFrame) -> np.ndarray:
+        """
+        `evaluate` for every candle of `df` at once, as if each were the last closed candle.
+
+        :return: 1, -1 or 0 per candle, 0 for candles without `lookback` candles before them.
+        """
+        open_, high, low, close = (df[column].to_numpy(dtype=np.float64) for column in ('Open', 'High', 'Low', 'Close'))
+        sma = create_sma(close=df.Close, length=self.sma_period).to_numpy(dtype=np.float64)
+
+        bullish = open_ < close
+        body_size = np.abs(open_ - close)
+        body_max = np.maximum(open_, close)
+        body_min = np.minimum(open_, close)
+        shadows_touch_size = np.where(bullish, open_ - low, high - open_)
+        opposite_shadow_size = np.where(bullish, high - close, close - low)
+
+        with np.errstate(divide='ignore', invalid='ignore'):  # Doji, same results as the float64 scalars
+            signal = ~((body_min < sma) & (sma < body_max))
+            signal &= bullish == (close > sma)
+            signal &= ~(shadows_touch_size / body_size < self.shadow_to_body_ratio)
+            if self.opposite_shadow_to_body_ratio_limit is not None:
+                signal &= ~(opposite_shadow_size / body_size > self.opposite_shadow_to_body_ratio_limit)
+
+        if not self.ignore_sma_touch:
+            padding = self.shadow_multiplier * shadows_touch_size
+            signal &= np.where(bullish, low - padding <= sma, high + padding >= sma)
+
+        signal[:self.lookback - 1] = False
+        return np.where(signal, np.where(bullish, 1, -1), 0)
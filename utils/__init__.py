@@ -1,2 +1,2 @@
 from .parsers import parse_interval
-from .timeUtils import seconds_to_next_boundry
\ No newline at end of file
+from .timeUtils import seconds_to_next_boundry, utc_timestamp, set_clock_offset, get_clock_offset
\ No newline at end of file
@@ -1,10 +1,28 @@
-from datetime import datetime, timezone
+import time
+
+# Seconds added to the local clock, e.g. the measured offset to the exchange clock
+_clock_offset: float = 0.0
+
+
+def set_clock_offset(seconds: float):
+    global _clock_offset
+    _clock_offset = seconds
+
+
+def get_clock_offset() -> float:
+    return _clock_offset
+
+
+def utc_timestamp() -> float:
+    """Current UNIX timestamp (UTC) of the local clock corrected by the clock offset."""
+    return time.time() + _clock_offset
+
 
 def seconds_to_next_boundry(interval_seconds: int) -> float:
     """
     Return seconds until the next exact multiple of `interval_seconds`
     since the UNIX epoch (UTC).
     """
-    now = datetime.now(timezone.utc).timestamp()
+    now = utc_timestamp()
     offset = now % interval_seconds
-    return 0.0 if offset == 0.0 else interval_seconds - offset
\ No newline at end of file
+    return 0.0 if offset == 0.0 else interval_seconds - offset